@@ -0,0 +1,164 @@
+import logging
+import numpy as np
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class IVFIndex:
+    """
+    In-process inverted-file (IVF) index for cosine nearest-neighbour search, pure NumPy.
+
+    Vectors are bucketed under k-means centroids; a query only scores the n_probe closest
+    buckets. Markets can be added and removed one at a time as they open and close.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, train_iterations=10, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_iterations = train_iterations
+        self.seed = seed
+
+        self.centroids = None
+        self._list_vectors = []
+        self._list_ids = []
+        self._locations = {}
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, market_id):
+        return market_id in self._locations
+
+    def train(self, vectors):
+        """Fit centroids with spherical k-means; any vectors already stored are re-bucketed"""
+        if len(vectors) == 0:
+            # Nothing to fit on (e.g. every market already verified); stay untrained until vectors arrive
+            return
+        vectors = _normalize(vectors)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        rng = np.random.default_rng(self.seed)
+
+        centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)]
+        for _ in range(self.train_iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            counts = np.bincount(assignment, minlength=n_lists)
+            order = np.argsort(assignment, kind='stable')
+            sums = np.zeros_like(centroids)
+            occupied = np.flatnonzero(counts)
+            sums[occupied] = np.add.reduceat(vectors[order], np.cumsum(counts)[occupied] - counts[occupied])
+            empty = counts == 0
+            # Re-seed empty clusters so every list stays usable
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        stored_ids, stored_vectors = self._all_items()
+        self.centroids = centroids
+        self._list_vectors = [np.empty((0, vectors.shape[1]), dtype=np.float32) for _ in range(n_lists)]
+        self._list_ids = [[] for _ in range(n_lists)]
+        self._locations = {}
+        if stored_ids:
+            self.add(stored_ids, stored_vectors)
+
+    def _all_items(self):
+        ids = [market_id for bucket in self._list_ids for market_id in bucket]
+        if not ids:
+            return [], None
+        return ids, np.concatenate([v for v in self._list_vectors if len(v)])
+
+    def add(self, ids, vectors):
+        """Insert (or replace) vectors for the given ids; trains on this batch if untrained"""
+        ids = list(ids)
+        if not ids:
+            return
+        vectors = _normalize(vectors)
+        if self.centroids is None:
+            self.train(vectors)
+
+        replaced = [market_id for market_id in ids if market_id in self._locations]
+        if replaced:
+            self.remove(replaced)
+
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        for list_no in np.unique(assignment):
+            members = np.flatnonzero(assignment == list_no)
+            start = len(self._list_ids[list_no])
+            self._list_vectors[list_no] = np.concatenate([self._list_vectors[list_no], vectors[members]])
+            for offset, member in enumerate(members):
+                self._list_ids[list_no].append(ids[member])
+                self._locations[ids[member]] = (list_no, start + offset)
+
+    def remove(self, ids):
+        """Delete ids from the index (unknown ids are ignored)"""
+        removed = 0
+        for market_id in ids:
+            location = self._locations.pop(market_id, None)
+            if location is None:
+                continue
+            list_no, position = location
+            bucket_ids = self._list_ids[list_no]
+            bucket_vectors = self._list_vectors[list_no]
+            last = len(bucket_ids) - 1
+            # Swap-remove keeps deletes O(1) per id
+            if position != last:
+                moved_id = bucket_ids[last]
+                bucket_ids[position] = moved_id
+                bucket_vectors[position] = bucket_vectors[last]
+                self._locations[moved_id] = (list_no, position)
+            bucket_ids.pop()
+            self._list_vectors[list_no] = bucket_vectors[:last]
+            removed += 1
+        return removed
+
+    def search(self, queries, k=5):
+        """
+        Approximate top-k cosine neighbours for each query.
+
+        Returns:
+            tuple: (ids, scores) where ids is a (n_queries, k) object array (None where fewer
+                   than k neighbours were found) and scores the matching float32 array (-inf padded)
+        """
+        queries = _normalize(queries)
+        n_queries = len(queries)
+        best_scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+        best_ids = np.full((n_queries, k), None, dtype=object)
+        if self.centroids is None or not self._locations:
+            return best_ids, best_scores
+
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        # Score list by list so every query probing a list is handled in one matmul
+        for list_no in np.unique(probes):
+            bucket_vectors = self._list_vectors[list_no]
+            if not len(bucket_vectors):
+                continue
+            query_rows = np.flatnonzero((probes == list_no).any(axis=1))
+            scores = queries[query_rows] @ bucket_vectors.T
+            bucket_ids = np.empty(len(bucket_vectors), dtype=object)
+            bucket_ids[:] = self._list_ids[list_no]
+
+            merged_scores = np.concatenate([best_scores[query_rows], scores], axis=1)
+            merged_ids = np.concatenate([best_ids[query_rows], np.broadcast_to(bucket_ids, scores.shape)], axis=1)
+            top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores[query_rows] = np.take_along_axis(merged_scores, top, axis=1)
+            best_ids[query_rows] = np.take_along_axis(merged_ids, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        return np.take_along_axis(best_ids, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def rebuild_if_skewed(self, factor=4.0):
+        """Retrain when the index has grown well past what the centroids were fitted on"""
+        if self.centroids is None or not self._locations:
+            return False
+        if len(self._locations) <= factor * len(self.centroids) ** 2:
+            return False
+        logging.info(f"Retraining IVF index: {len(self._locations)} vectors over {len(self.centroids)} lists")
+        _, vectors = self._all_items()
+        self.train(vectors)
+        return True
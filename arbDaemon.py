@@ -0,0 +1,224 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+import metrics
+from analyzeMarkets import (SIMILAR_MARKETS_FILE, run_market_matcher, drop_verified_markets, known_match_pairs,
+                            live_embedding_texts)
+from catalogStore import CatalogStore
+from embeddingCache import EmbeddingCache
+from encoders import get_encoder
+from getMarkets import PolyMarketAPI, KalshiAPI
+from priceEngine import PriceEngine, PollingFeed, resolve_pairs, print_opportunity
+from snapshots import save_snapshot
+from verificationCache import VerificationCache
+
+OPPORTUNITIES_FILE = 'opportunities.jsonl'
+
+
+class Stage(threading.Thread):
+    """
+    One pipeline stage: run_once() every `interval` seconds, or sooner when trigger() is called.
+
+    Triggers coalesce, so a slow stage never builds up a backlog of work from a fast upstream
+    stage; it just runs again with the latest state.
+    """
+
+    def __init__(self, name, interval, run_once, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self.run_once = run_once
+        self.stop_event = stop_event
+        self.runs = 0
+        self.last_duration = None
+        self._triggered = threading.Event()
+
+    def trigger(self):
+        self._triggered.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self._triggered.clear()
+            started = time.perf_counter()
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.exception(f"{self.name} stage failed: {e}")
+            self.last_duration = time.perf_counter() - started
+            metrics.observe('stage_seconds', self.last_duration, stage=self.name)
+            self.runs += 1
+
+            deadline = time.monotonic() + max(0.0, self.interval - self.last_duration)
+            while not self.stop_event.is_set() and not self._triggered.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._triggered.wait(min(remaining, 0.5))
+
+
+class ArbDaemon:
+    """
+    Long-running sync -> match -> price loop that keeps catalogs, embeddings, the encoder and
+    verified pairs in memory between cycles.
+
+    The sync stage refreshes both catalogs through their CatalogStores and triggers matching
+    when anything changed. The match stage writes new candidate pairs to the similar-markets
+    snapshot for arbReviewCli and re-resolves verified pairs for pricing. The price stage polls
+    verified pairs on a fast loop and pushes opportunities onto a bounded queue, dropping
+    (and counting) them if nobody is consuming.
+    """
+
+    def __init__(self, sync_interval=300, match_interval=900, price_interval=1.0, stake=10, queue_size=1000):
+        self.stake = stake
+        self.stop_event = threading.Event()
+        self.opportunities = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+        self.poly_api = PolyMarketAPI()
+        self.kalshi_api = KalshiAPI()
+        self.poly_store = CatalogStore('polymarket', 'id')
+        self.kalshi_store = CatalogStore('kalshi', 'ticker')
+        self.encoder = get_encoder()
+        self.embedding_cache = EmbeddingCache(self.encoder.model_id)
+        self.verification_cache = VerificationCache().load()
+
+        self.poly_markets = pd.DataFrame()
+        self.kalshi_markets = pd.DataFrame()
+        self.engine = None
+        self.feed = None
+        self._clob_client = None
+        self._lock = threading.Lock()
+
+        self.sync_stage = Stage('sync', sync_interval, self.sync_once, self.stop_event)
+        self.match_stage = Stage('match', match_interval, self.match_once, self.stop_event)
+        self.price_stage = Stage('price', price_interval, self.price_once, self.stop_event)
+
+    def sync_once(self):
+        poly_markets = self.poly_api.sync(self.poly_store)
+        kalshi_markets = self.kalshi_api.sync(self.kalshi_store)
+        with self._lock:
+            # Only listings and delistings need re-matching; price moves are the price stage's job
+            changed = (self.poly_markets.empty or self.kalshi_markets.empty
+                       or poly_markets.empty or kalshi_markets.empty
+                       or set(poly_markets['id']) != set(self.poly_markets['id'])
+                       or set(kalshi_markets['ticker']) != set(self.kalshi_markets['ticker']))
+            self.poly_markets, self.kalshi_markets = poly_markets, kalshi_markets
+        if changed:
+            self.match_stage.trigger()
+
+    def match_once(self):
+        with self._lock:
+            poly_markets, kalshi_markets = self.poly_markets, self.kalshi_markets
+        if poly_markets.empty or kalshi_markets.empty:
+            return
+
+        # Pick up verdicts made in the review CLI since the last cycle
+        self.verification_cache.load()
+        labels = self.verification_cache.labeled_pairs()
+        unmatched_poly, unmatched_kalshi = drop_verified_markets(poly_markets, kalshi_markets, self.verification_cache)
+        candidates = run_market_matcher(unmatched_poly, unmatched_kalshi, self.embedding_cache, labels=labels, encoder=self.encoder)
+        known = known_match_pairs(labels, poly_markets, kalshi_markets)
+        save_snapshot(pd.concat([known, candidates], ignore_index=True), SIMILAR_MARKETS_FILE)
+
+        self.embedding_cache.evict(live_embedding_texts(poly_markets, kalshi_markets, labels))
+        self.embedding_cache.save()
+
+        pairs = resolve_pairs(labels[labels['is_match']].to_dict('records'))
+        with self._lock:
+            self.engine = PriceEngine(pairs, self.stake, on_opportunity=self._publish)
+            self.feed = PollingFeed(None, self._get_clob_client(), pairs)
+        logging.info(f"Match cycle: {len(candidates)} candidates for review, pricing {len(pairs)} verified pairs")
+
+    def _get_clob_client(self):
+        if self._clob_client is None:
+            from placeOrder import get_polymarket_client
+            self._clob_client = get_polymarket_client()
+        return self._clob_client
+
+    def price_once(self):
+        with self._lock:
+            engine, feed = self.engine, self.feed
+        if engine is None:
+            return
+        for update in feed.poll_once():
+            engine.apply_update(update)
+
+    def _publish(self, pair, arb, prices):
+        try:
+            self.opportunities.put_nowait({'ts': time.time(), 'pair': pair, 'arb': arb, 'prices': prices})
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc('opportunities_dropped_total')
+
+    def start(self):
+        for stage in (self.sync_stage, self.match_stage, self.price_stage):
+            stage.start()
+        return self
+
+    def stop(self, timeout=30):
+        """Signal every stage, let in-flight cycles finish, then close the verification cache"""
+        self.stop_event.set()
+        stages = [stage for stage in (self.sync_stage, self.match_stage, self.price_stage) if stage.is_alive()]
+        for stage in stages:
+            stage.trigger()
+        for stage in stages:
+            stage.join(timeout)
+        running = [stage.name for stage in stages if stage.is_alive()]
+        if running:
+            # Closing under a running stage would pull SQLite away mid-query; unflushed rows stay
+            # flagged locally and are written on the next start
+            logging.warning(f"Stages still running after {timeout}s: {running}, leaving the verification cache open")
+            return
+        self.verification_cache.close()
+
+    def status(self):
+        stages = {stage.name: {'runs': stage.runs, 'last_duration': stage.last_duration}
+                  for stage in (self.sync_stage, self.match_stage, self.price_stage)}
+        return {'stages': stages, 'queued': self.opportunities.qsize(), 'dropped': self.dropped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuously sync, match and price markets, emitting opportunities")
+    parser.add_argument('--sync-interval', type=float, default=300)
+    parser.add_argument('--match-interval', type=float, default=900)
+    parser.add_argument('--price-interval', type=float, default=1.0)
+    parser.add_argument('--stake', type=float, default=10)
+    parser.add_argument('--output', default=OPPORTUNITIES_FILE, help="JSONL file opportunities are appended to")
+    parser.add_argument('--status-interval', type=float, default=60)
+    parser.add_argument('--metrics-port', type=int, default=os.getenv("METRICS_PORT"),
+                        help="serve Prometheus metrics on this port (default METRICS_PORT, off if unset)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.metrics_port:
+        metrics.serve_prometheus(args.metrics_port)
+
+    daemon = ArbDaemon(args.sync_interval, args.match_interval, args.price_interval, args.stake).start()
+    last_status = time.monotonic()
+    try:
+        with open(args.output, 'a') as f:
+            while True:
+                try:
+                    opportunity = daemon.opportunities.get(timeout=1)
+                except queue.Empty:
+                    opportunity = None
+                if opportunity is not None:
+                    print_opportunity(opportunity['pair'], opportunity['arb'], opportunity['prices'])
+                    f.write(json.dumps(opportunity, default=str) + "\n")
+                    f.flush()
+                if time.monotonic() - last_status > args.status_interval:
+                    logging.info(f"Daemon status: {daemon.status()}")
+                    last_status = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,71 @@ from rich.console import Console
 from rich.panel import Panel
 from simple_term_menu import TerminalMenu
 import pandas as pd
-from curl_cffi import requests
 import json
+import threading
+import time
 from typing import Dict, Any
 from getArbPreview import get_current_prices, calculate_arbitrage
-from placeOrder import kalshi_auth, get_polymarket_client, execute_order
-from db import supabase, NOT_FOUND, get_market_verification, insert_market_verification
+from placeOrder import get_polymarket_client, execute_order, PolymarketOrderPreparer, KALSHI_ORDERS_URL
+from snapshots import load_snapshot
+from venueClient import get_order_client
+from kalshiToken import get_kalshi_token_manager
+from db import NOT_FOUND
+from verificationCache import VerificationCache
+from reviewPipeline import ReviewPipeline
 
 
 global result
 
 console = Console()
 
-kalshi_auth_token = kalshi_auth()
-polymarket_client = get_polymarket_client()
+# Network clients are built on first use so importing this module (and showing the first menu) stays fast
+_clients = {}
+_clients_lock = threading.RLock()
 
-def load_arb_data(file_path='similar_markets.csv') -> pd.DataFrame:
-    """Load and parse arbitrage data from CSV"""
-    return pd.read_csv(file_path)
+def get_client():
+    """Polymarket CLOB client"""
+    with _clients_lock:
+        if 'polymarket' not in _clients:
+            _clients['polymarket'] = get_polymarket_client()
+        return _clients['polymarket']
+
+def get_order_preparer():
+    with _clients_lock:
+        if 'order_preparer' not in _clients:
+            _clients['order_preparer'] = PolymarketOrderPreparer(get_client())
+        return _clients['order_preparer']
+
+def get_verification_cache():
+    with _clients_lock:
+        if 'verifications' not in _clients:
+            _clients['verifications'] = VerificationCache().load()
+        return _clients['verifications']
+
+def warm_up():
+    """Log in, build the CLOB client and open connections to both order endpoints in the background"""
+    def run():
+        try:
+            # Loads the cached token if still valid and keeps it fresh for the whole session
+            get_kalshi_token_manager()
+            get_order_preparer()
+            get_order_client().warm([KALSHI_ORDERS_URL])
+            # CLOB orders go through py_clob_client's own HTTP client, so warm that one
+            get_client().get_ok()
+        except Exception as e:
+            console.print(f"[red]Warm-up failed: {e}[/red]")
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+ARB_COLUMNS = ['poly_question', 'kalshi_title', 'kalshi_id', 'poly_id', 'similarity_score']
+# Pairs priced ahead of the operator, and how old prefetched prices may be before they are refetched
+REVIEW_LOOKAHEAD = 50
+PRICE_MAX_AGE = 15
+
+def load_arb_data(file_path='similar_markets.arrow') -> pd.DataFrame:
+    """Load the matcher's snapshot, reading only the columns the review loop needs"""
+    return load_snapshot(file_path, columns=ARB_COLUMNS)
 
 def format_arb_preview(arb_preview) -> Dict[str, Any]:
     """Parse and format the Arb Preview"""
@@ -52,7 +99,32 @@ Min ROI: {arb_data['min_roi']}
 """
     console.print(Panel(content, title="Arbitrage Opportunity", expand=False))
 
-def review_market_and_arb(row):
+def refresh_prices(row):
+    """Fetch live prices for one pair; returns (prices, arb_opportunity or 'No Arbitrage')"""
+    kalshi_yes_ask, kalshi_no_ask, polymarket_yes_ask, polymarket_no_ask, polymarket_yes_token, polymarket_no_token = get_current_prices(
+        None, get_client(), row['kalshi_id'], row['poly_id']
+    )
+    prices = {
+        'kalshi_yes_ask': kalshi_yes_ask,
+        'kalshi_no_ask': kalshi_no_ask,
+        'polymarket_yes_ask': polymarket_yes_ask,
+        'polymarket_no_ask': polymarket_no_ask,
+        'polymarket_yes_token': polymarket_yes_token,
+        'polymarket_no_token': polymarket_no_token
+    }
+    if (kalshi_yes_ask > 0 and kalshi_no_ask > 0 and 
+        polymarket_yes_ask > 0 and polymarket_no_ask > 0):
+        # Last Parameter is the stake size (in dollars)
+        return prices, calculate_arbitrage(
+            kalshi_yes_ask, kalshi_no_ask, 
+            polymarket_yes_ask, polymarket_no_ask, 10
+        )
+    return prices, 'No Arbitrage'
+
+def review_market_and_arb(item):
+    """Review one prefetched opportunity from the pipeline"""
+    row = item['row']
+    market_verification_result = item['verification']
     console.clear()
     # First panel: Market comparison
     comparison = f"""
@@ -63,83 +135,88 @@ def review_market_and_arb(row):
     
     options = ["Markets Match (Show Arb)", "Markets Different", "Skip", "Quit"]
     terminal_menu = TerminalMenu(options, title="Are these markets equivalent?")
-    # Get the verification status of the market
-    market_verification_result = get_market_verification(row['kalshi_id'], row['poly_id'])
-    choice = 1
+    # Known matches skip the question; known differences never reach the queue
     if market_verification_result == True:
         choice = 0
-    elif market_verification_result == False:
-        return 1
-    # Market not found case
     else:
         choice = terminal_menu.show()
     
     if choice == 0:  # Markets Match
         if market_verification_result == NOT_FOUND:
-            insert_market_verification(row['kalshi_id'], row['poly_id'], row['kalshi_title'], row['poly_question'], True)
+            get_verification_cache().put(row['kalshi_id'], row['poly_id'], row['kalshi_title'], row['poly_question'], True)
         console.clear()
-        kalshi_yes_ask, kalshi_no_ask, polymarket_yes_ask, polymarket_no_ask, polymarket_yes_token, polymarket_no_token = get_current_prices(
-            kalshi_auth_token, polymarket_client, row['kalshi_id'], row['poly_id']
-        )
-        prices = {
-            'kalshi_yes_ask': kalshi_yes_ask,
-            'kalshi_no_ask': kalshi_no_ask,
-            'polymarket_yes_ask': polymarket_yes_ask,
-            'polymarket_no_ask': polymarket_no_ask,
-            'polymarket_yes_token': polymarket_yes_token,
-            'polymarket_no_token': polymarket_no_token
-        }
-        if (kalshi_yes_ask > 0 and kalshi_no_ask > 0 and 
-            polymarket_yes_ask > 0 and polymarket_no_ask > 0):
-            # Last Parameter is the stake size (in dollars)
-            arb_opportunity = calculate_arbitrage(
-                kalshi_yes_ask, kalshi_no_ask, 
-                polymarket_yes_ask, polymarket_no_ask, 10
-            )
-            if arb_opportunity == 'No Arbitrage':
-                return "pass"
-            display_opportunity(arb_opportunity, row, prices)
-            row['arb_opportunity'] = arb_opportunity
-            row['prices'] = prices
-        else:
+        prices = item['prices']
+        arb_opportunity = item['arb_opportunity']
+        if time.time() - item['fetched_at'] > PRICE_MAX_AGE:
+            prices, arb_opportunity = refresh_prices(row)
+        if arb_opportunity == 'No Arbitrage':
             return "pass"
+        display_opportunity(arb_opportunity, row, prices)
+        row['arb_opportunity'] = arb_opportunity
+        row['prices'] = prices
+        # Sign the Polymarket leg while the operator decides
+        poly_token, poly_amount, poly_price = polymarket_leg(arb_opportunity, prices)
+        get_order_preparer().prepare(poly_token, [poly_amount], price=poly_price)
         
         options = ["Execute Trade", "Pass"]
         terminal_menu = TerminalMenu(options, title="Select Action:")
         action = terminal_menu.show()
-        return "execute" if action == 0 else "pass"
+        if action == 0:
+            row['decided_at'] = time.perf_counter()
+            return "execute"
+        return "pass"
     else:
         if market_verification_result == NOT_FOUND:
-            insert_market_verification(row['kalshi_id'], row['poly_id'], row['kalshi_title'], row['poly_question'], False)
+            get_verification_cache().put(row['kalshi_id'], row['poly_id'], row['kalshi_title'], row['poly_question'], False)
     
     return {
         1: "different",
         2: "skip", 
         3: "quit"
-    }.get(choice)
+    }.get(choice, "quit")
+
+def report_trade(trade):
+    """Tell the operator how the trade ended, loudly when a position may be left open"""
+    if trade['outcome'] in ('both', 'hedged'):
+        console.print(f"[green]Trade executed! ({trade['outcome']})[/green]")
+        return
+    legs = f"Kalshi {trade['kalshi']['state']}, Polymarket {trade['polymarket']['state']}"
+    for name in ('hedge', 'unwind'):
+        if trade[name] is not None:
+            legs += f", {name} {trade[name]['state']}"
+    console.print(f"[red]Trade {trade['outcome']}: {legs}. Check both venues before continuing.[/red]")
 
 def review_arb_opportunities():
-    """Process opportunities one by one with menu selection"""
+    """Review opportunities best-first as the background pipeline prices them"""
     df = load_arb_data()
     verified_markets = []
+    pipeline = ReviewPipeline(df, get_client(), lookahead=REVIEW_LOOKAHEAD, verification_cache=get_verification_cache()).start()
     
-    for index, row in df.iterrows():
-
-            
-        result = review_market_and_arb(row)
+    for item in pipeline:
+        result = review_market_and_arb(item)
         
         if result == "quit":
             break
         elif result in ["skip", "different", "pass"]:
             continue
         elif result == "execute":
+            row = item['row']
             kalshi_params, polymarket_params = prepare_orders(row)
-            execute_order(kalshi_params, polymarket_params)
+            trade = execute_order(kalshi_params, polymarket_params)
             verified_markets.append(row)
-            console.print("[green]Trade executed![/green]")
+            report_trade(trade)
     
+    pipeline.stop()
+    console.print(f"Scanned {pipeline.stats['scanned']} pairs: {pipeline.stats['different']} known different, "
+                  f"{pipeline.stats['no_arbitrage']} without arbitrage, {pipeline.stats['queued']} queued")
     return verified_markets
 
+def polymarket_leg(arb_opportunity, prices):
+    """(token_id, amount, ask) of the Polymarket side of an opportunity"""
+    if arb_opportunity['market_allocation']['yes_market'] == 'polymarket':
+        return prices['polymarket_yes_token'], arb_opportunity['optimal_allocation']['polymarket_allocation'], prices['polymarket_yes_ask']
+    return prices['polymarket_no_token'], arb_opportunity['optimal_allocation']['polymarket_allocation'], prices['polymarket_no_ask']
+
 def prepare_orders(row):
     """Prepare orders for execution"""
     
@@ -147,25 +224,33 @@ def prepare_orders(row):
     prices = row['prices']
 
     kalshi__contracts = arb_opportunity['optimal_allocation']['kalshi_contracts']
-    poly_allocation = arb_opportunity['optimal_allocation']['polymarket_allocation']
+    poly_token, poly_allocation, poly_ask = polymarket_leg(arb_opportunity, prices)
 
     kalshi_params = {
-        'auth_token': kalshi_auth_token,
+        'auth_token': None,  # resolved from the shared token manager at send time
         'ticker': row['kalshi_id'],
         'count': kalshi__contracts,
         'side': 'yes' if arb_opportunity['market_allocation']['yes_market'] == 'kalshi' else 'no'
     }
     polymarket_params = {
-        'token_id': prices['polymarket_yes_token'] if arb_opportunity['market_allocation']['yes_market'] == 'polymarket' else prices['polymarket_no_token'],
+        'token_id': poly_token,
         'amount': poly_allocation,
-        'client': polymarket_client
+        'price': poly_ask,
+        'client': get_client(),
+        'signed_order': get_order_preparer().take(poly_token, poly_allocation, poly_ask),
+        'decided_at': row.get('decided_at', time.perf_counter()),
     }
     return kalshi_params, polymarket_params
     
 
 def main():
     console.print("[bold blue]Arbitrage Opportunity Review[/bold blue]")
-    verified_markets = review_arb_opportunities()
+    warm_up()
+    try:
+        verified_markets = review_arb_opportunities()
+    finally:
+        if 'verifications' in _clients:
+            _clients['verifications'].close()
     
     if verified_markets:
         df = pd.DataFrame(verified_markets)
@@ -0,0 +1,69 @@
+import json
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+from snapshots import load_snapshot, save_snapshot
+
+
+class CatalogStore:
+    """
+    Local snapshot of one venue's open catalog plus the watermark of the last sync.
+
+    A sync only fetches markets changed since the watermark and upserts them into the
+    snapshot by key, so a rescan moves the delta instead of the full catalog.
+    """
+
+    def __init__(self, venue, key_column, store_dir='catalog_store'):
+        self.venue = venue
+        self.key_column = key_column
+        self.dir = Path(store_dir)
+        self.snapshot_path = self.dir / f"{venue}.arrow"
+        self.state_path = self.dir / f"{venue}_state.json"
+
+    def load(self):
+        """Return the stored snapshot, or an empty DataFrame if there is none yet"""
+        if not self.snapshot_path.exists():
+            return pd.DataFrame()
+        try:
+            return load_snapshot(self.snapshot_path)
+        except Exception as e:
+            logging.error(f"Unreadable {self.venue} snapshot, starting over: {e}")
+            return pd.DataFrame()
+
+    @property
+    def watermark(self):
+        """Watermark recorded by the last successful sync (None before the first one)"""
+        if not self.state_path.exists() or not self.snapshot_path.exists():
+            return None
+        with open(self.state_path) as f:
+            return json.load(f).get('watermark')
+
+    def merge(self, changes, watermark, is_live=None):
+        """
+        Upsert changed rows into the snapshot, drop rows that are no longer live and persist.
+
+        Args:
+            changes (pd.DataFrame): Markets created or updated since the last watermark
+            watermark: New watermark to record (any JSON-serializable value)
+            is_live (callable): Maps the merged DataFrame to a boolean mask of rows to keep
+        """
+        snapshot = self.load()
+        if not changes.empty:
+            changes = changes.drop_duplicates(subset=self.key_column, keep='first')
+            if not snapshot.empty:
+                snapshot = snapshot[~snapshot[self.key_column].isin(changes[self.key_column])]
+            snapshot = pd.concat([snapshot, changes], ignore_index=True) if not snapshot.empty else changes.reset_index(drop=True)
+
+        if is_live is not None and not snapshot.empty:
+            snapshot = snapshot[is_live(snapshot)].reset_index(drop=True)
+
+        self.save(snapshot, watermark)
+        logging.info(f"{self.venue}: merged {len(changes)} changed markets, {len(snapshot)} in snapshot")
+        return snapshot
+
+    def save(self, snapshot, watermark):
+        save_snapshot(snapshot, self.snapshot_path)
+        with open(self.state_path, 'w') as f:
+            json.dump({'watermark': watermark}, f)
@@ -1,23 +1,61 @@
 import os
+import threading
 import dotenv
-from supabase import create_client, Client
 
 dotenv.load_dotenv()
 
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+
+_supabase = None
+_supabase_lock = threading.Lock()
+
+def get_supabase():
+    """Supabase client, created (and the supabase package imported) on first use"""
+    global _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            from supabase import create_client
+            _supabase = create_client(url, key)
+        return _supabase
+
+def __getattr__(name):
+    # Keeps `from db import supabase` working without connecting at import time
+    if name == 'supabase':
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 NOT_FOUND = "NOT_FOUND"
 
 def get_market_verification(kalshi_ticker, polymarket_id):
     """Get the verification status of a market"""
-    response = supabase.table('markets').select('*').eq('kalshi_ticker', kalshi_ticker).eq('polymarket_id', polymarket_id).execute()
-    print('response', response )
+    response = get_supabase().table('markets').select('*').eq('kalshi_ticker', kalshi_ticker).eq('polymarket_id', polymarket_id).execute()
     if response.data:
         return response.data[0]['is_match']
     return NOT_FOUND
 
 def insert_market_verification(kalshi_ticker, polymarket_id, kalshi_title, poly_question, is_match):
     """Insert the verification status of a market"""
-    supabase.table('markets').insert({'kalshi_ticker': kalshi_ticker, 'polymarket_id': polymarket_id, 'is_match': is_match, 'poly_question': poly_question, 'kalshi_title': kalshi_title}).execute()
+    get_supabase().table('markets').insert({'kalshi_ticker': kalshi_ticker, 'polymarket_id': polymarket_id, 'is_match': is_match, 'poly_question': poly_question, 'kalshi_title': kalshi_title}).execute()
+
+def get_verified_pairs():
+    """All pairs an operator has confirmed as the same market"""
+    response = get_supabase().table('markets').select('kalshi_ticker, polymarket_id, kalshi_title, poly_question').eq('is_match', True).execute()
+    return response.data
+
+def fetch_market_verifications(client=None, page_size=1000):
+    """Every row of the markets table, paged (PostgREST caps a single response)"""
+    client = client or get_supabase()
+    rows = []
+    start = 0
+    while True:
+        response = client.table('markets').select('kalshi_ticker, polymarket_id, kalshi_title, poly_question, is_match').range(start, start + page_size - 1).execute()
+        rows.extend(response.data)
+        if len(response.data) < page_size:
+            return rows
+        start += page_size
+
+def insert_market_verifications(rows, client=None):
+    """Insert many verification rows (dicts shaped like insert_market_verification's) in one request"""
+    if rows:
+        (client or get_supabase()).table('markets').insert(rows).execute()
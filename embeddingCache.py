@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding store keyed by sha1(model id + text).
+
+    Vectors live in a single memory-mapped .npy matrix with a JSON key -> row index next to it,
+    so a rescan only encodes texts that are new (or whose wording changed) since the last save.
+    """
+
+    def __init__(self, model_id, cache_dir='embedding_cache', batch_size=1024):
+        self.model_id = model_id
+        self.batch_size = batch_size
+        self.dir = Path(cache_dir) / re.sub(r'[^\w.-]+', '_', model_id)
+        self.vectors_path = self.dir / 'vectors.npy'
+        self.index_path = self.dir / 'index.json'
+
+        self._index = {}
+        self._vectors = None
+        self._pending = []
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not (self.vectors_path.exists() and self.index_path.exists()):
+            return
+        try:
+            self._vectors = np.load(self.vectors_path, mmap_mode='r')
+            with open(self.index_path) as f:
+                self._index = json.load(f)
+            if len(self._index) != len(self._vectors):
+                raise ValueError("index and vector matrix are out of sync")
+        except Exception as e:
+            logging.error(f"Discarding unreadable embedding cache {self.dir}: {e}")
+            self._vectors = None
+            self._index = {}
+
+    def text_key(self, text):
+        return hashlib.sha1(f"{self.model_id}\0{text}".encode('utf-8')).hexdigest()
+
+    def __len__(self):
+        return len(self._index)
+
+    def _stored_rows(self):
+        return 0 if self._vectors is None else len(self._vectors)
+
+    def get(self, texts, encode_fn):
+        """
+        Return a (len(texts), dim) float32 matrix, calling encode_fn only for texts not cached yet.
+
+        Args:
+            texts (list): Strings to embed
+            encode_fn (callable): Maps a list of strings to an array of embeddings
+        """
+        keys = [self.text_key(text) for text in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._index and key not in missing:
+                missing[key] = text
+
+        if missing:
+            missing_keys = list(missing)
+            missing_texts = list(missing.values())
+            for start in range(0, len(missing_texts), self.batch_size):
+                batch = np.asarray(encode_fn(missing_texts[start:start + self.batch_size]), dtype=np.float32)
+                next_row = self._stored_rows() + sum(len(p) for p in self._pending)
+                for offset, key in enumerate(missing_keys[start:start + self.batch_size]):
+                    self._index[key] = next_row + offset
+                self._pending.append(batch)
+            self._dirty = True
+            logging.info(f"Embedding cache: encoded {len(missing)} new of {len(texts)} texts")
+
+        return self._gather([self._index[key] for key in keys])
+
+    def _gather(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        stored = self._stored_rows()
+        dim = self._dim()
+        out = np.empty((len(rows), dim), dtype=np.float32)
+        if len(rows) == 0:
+            return out
+
+        from_disk = rows < stored
+        if from_disk.any():
+            out[from_disk] = self._vectors[rows[from_disk]]
+        if (~from_disk).any():
+            pending = np.concatenate(self._pending) if len(self._pending) > 1 else self._pending[0]
+            self._pending = [pending]
+            out[~from_disk] = pending[rows[~from_disk] - stored]
+        return out
+
+    def _dim(self):
+        if self._vectors is not None:
+            return self._vectors.shape[1]
+        if self._pending:
+            return self._pending[0].shape[1]
+        return 0
+
+    def evict(self, live_texts):
+        """Drop every cached vector whose text is not in live_texts (e.g. markets that have closed)"""
+        live_keys = {self.text_key(text) for text in live_texts}
+        stale = [key for key in self._index if key not in live_keys]
+        for key in stale:
+            del self._index[key]
+        if stale:
+            self._dirty = True
+            logging.info(f"Embedding cache: evicted {len(stale)} stale vectors")
+        return len(stale)
+
+    def save(self):
+        """Compact and persist the cache; a no-op when nothing changed since the last load/save"""
+        if not self._dirty:
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        keys = list(self._index)
+        if not keys:
+            self._vectors = None
+            self._pending = []
+            self.vectors_path.unlink(missing_ok=True)
+            self.index_path.unlink(missing_ok=True)
+            self._dirty = False
+            return
+        vectors = self._gather([self._index[key] for key in keys])
+
+        tmp_vectors = self.vectors_path.with_suffix('.tmp.npy')
+        tmp_index = self.index_path.with_suffix('.tmp.json')
+        np.save(tmp_vectors, vectors)
+        with open(tmp_index, 'w') as f:
+            json.dump({key: row for row, key in enumerate(keys)}, f)
+
+        # Release the old mapping before replacing the file underneath it
+        self._vectors = None
+        self._pending = []
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_index, self.index_path)
+
+        self._dirty = False
+        self._load()
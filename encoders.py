@@ -0,0 +1,121 @@
+import logging
+import os
+import time
+
+import numpy as np
+
+import metrics
+
+USE_MODEL_URL = 'https://www.kaggle.com/models/google/universal-sentence-encoder/TensorFlow2/universal-sentence-encoder/2'
+SENTENCE_TRANSFORMER_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+ENCODER_CACHE_DIR = 'models'
+
+
+class UniversalSentenceEncoder:
+    """The original TF-hub Universal Sentence Encoder (TensorFlow is only imported when this is built)"""
+
+    def __init__(self, model_url=USE_MODEL_URL, batch_size=1024):
+        import tensorflow_hub as hub
+
+        self.model_id = model_url
+        self.batch_size = batch_size
+        self.model = hub.load(model_url)
+
+    def encode(self, texts):
+        """Embed a list of strings as a (len(texts), dim) float32 matrix"""
+        if not texts:
+            return np.zeros((0, 512), dtype=np.float32)
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            with metrics.timer('encoder_batch_seconds', encoder='use'):
+                batches.append(self.model(texts[start:start + self.batch_size]).numpy())
+        metrics.inc('encoded_texts_total', len(texts), encoder='use')
+        return np.vstack(batches).astype(np.float32, copy=False)
+
+
+class SentenceTransformerEncoder:
+    """
+    CPU sentence-transformers backend that runs from a local model cache.
+
+    The model is looked up in cache_folder first and only downloaded if it is missing (and
+    offline is False). backend='onnx' runs through onnxruntime; quantize=True uses int8
+    weights (dynamic quantization for torch, a quantized ONNX export for onnx).
+    """
+
+    def __init__(self, model_name=SENTENCE_TRANSFORMER_MODEL, cache_folder=ENCODER_CACHE_DIR, batch_size=256,
+                 threads=None, backend='torch', quantize=False, onnx_file='onnx/model_qint8_avx512_vnni.onnx',
+                 offline=False):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.batch_size = batch_size
+        self.model_id = f"st:{model_name}:{backend}{':int8' if quantize else ''}"
+
+        kwargs = {'cache_folder': cache_folder, 'device': 'cpu'}
+        if backend != 'torch':
+            kwargs['backend'] = backend
+            if quantize:
+                kwargs['model_kwargs'] = {'file_name': onnx_file}
+        try:
+            self.model = SentenceTransformer(model_name, local_files_only=True, **kwargs)
+        except OSError:
+            if offline:
+                raise
+            logging.info(f"{model_name} not in {cache_folder}, downloading once")
+            self.model = SentenceTransformer(model_name, **kwargs)
+
+        if quantize and backend == 'torch':
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def encode(self, texts):
+        """Embed a list of strings as a (len(texts), dim) float32 matrix"""
+        with metrics.timer('encoder_batch_seconds', encoder='sentence-transformers'):
+            embeddings = self.model.encode(list(texts), batch_size=self.batch_size, convert_to_numpy=True,
+                                           show_progress_bar=False)
+        metrics.inc('encoded_texts_total', len(texts), encoder='sentence-transformers')
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def get_encoder(name=None, **kwargs):
+    """
+    Build the encoder named by name or MATCH_ENCODER ('use', the default, or 'sentence-transformers').
+
+    sentence-transformers settings come from kwargs, falling back to ENCODER_MODEL,
+    ENCODER_BATCH_SIZE, ENCODER_THREADS, ENCODER_BACKEND, ENCODER_QUANTIZE and
+    ENCODER_OFFLINE (or HF_HUB_OFFLINE).
+    """
+    name = name or os.getenv("MATCH_ENCODER", "use")
+    if name == 'use':
+        return UniversalSentenceEncoder(**kwargs)
+    if name in ('sentence-transformers', 'st'):
+        settings = {
+            'model_name': os.getenv("ENCODER_MODEL", SENTENCE_TRANSFORMER_MODEL),
+            'batch_size': _env_int("ENCODER_BATCH_SIZE") or 256,
+            'threads': _env_int("ENCODER_THREADS"),
+            'backend': os.getenv("ENCODER_BACKEND", "torch"),
+            'quantize': os.getenv("ENCODER_QUANTIZE", "") in ("1", "true", "yes"),
+            'offline': (os.getenv("ENCODER_OFFLINE") or os.getenv("HF_HUB_OFFLINE", "")) in ("1", "true", "yes"),
+        }
+        settings.update(kwargs)
+        return SentenceTransformerEncoder(**settings)
+    raise ValueError(f"Unknown encoder: {name}")
+
+
+def time_encoder(name, texts, **kwargs):
+    """(cold start seconds, texts per second) for one encoder over texts"""
+    start = time.perf_counter()
+    encoder = get_encoder(name, **kwargs)
+    encoder.encode(texts[:1])
+    cold_start = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoder.encode(texts)
+    throughput = len(texts) / (time.perf_counter() - start)
+    return cold_start, throughput
@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+from placeOrder import (setup_logging, execute_kalshi_order, execute_polymarket_order, sign_polymarket_order,
+                        get_kalshi_order, get_polymarket_order_state, polymarket_worst_price,
+                        POLYMARKET_UNWIND_SLIPPAGE)
+
+# Seconds between lookups while waiting for a Kalshi order to appear
+KALSHI_LOOKUP_INTERVAL = 0.25
+
+
+def kalshi_filled_contracts(response):
+    """Contracts a Kalshi order response says were filled (0 for no response or a rejected order)"""
+    order = (response or {}).get('order')
+    if not order:
+        return 0
+    if 'fill_count' in order:
+        return int(order['fill_count'])
+    if order.get('status') == 'executed':
+        return int(order.get('count', 0)) - int(order.get('remaining_count', 0))
+    return 0
+
+
+def polymarket_filled_shares(response):
+    """Shares a CLOB post_order response says were bought (0 unless the order matched)"""
+    if not response or not response.get('success') or response.get('status') != 'matched':
+        return 0.0
+    return float(response.get('takingAmount') or 0)
+
+
+def polymarket_filled(response):
+    return bool(response) and bool(response.get('success')) and response.get('status') == 'matched'
+
+
+class ExecutionEngine:
+    """
+    Long-lived asyncio loop (in its own thread) that places both legs of a trade together.
+
+    Both legs are fired in the same loop iteration over the shared venue connections, each
+    with its own deadline and retry budget. A request that misses its deadline is still
+    waited for (up to settle_timeout), and any attempt that did not visibly fill has its
+    order looked up before anything else happens, so a late fill is never retried, hedged
+    or unwound on top of. Kalshi retries get a fresh client_order_id only once the previous
+    one is known not to have filled; Polymarket retries and hedges repost the same signed
+    order. Kalshi's HTTP timeout covers the settle period too, so a slow answer is still read
+    rather than dropped, and an attempt that came back without an order is polled for (up to
+    settle_timeout) before a new id is issued. If exactly one leg fills, the other leg gets one more hedge attempt and, failing
+    that, the filled leg is sold back. A leg whose state can't be established is reported
+    as 'unknown' and left for the operator.
+    """
+
+    def __init__(self, leg_timeout=5.0, retries=1, unwind=True, max_workers=4, settle_timeout=15.0):
+        """
+        Args:
+            leg_timeout (float): Seconds an attempt may take before the leg stops waiting on it
+            settle_timeout (float): Extra seconds to wait for a late request to come back (or a
+                                    Kalshi order to show up) before declaring the leg's state unknown
+        """
+        self.leg_timeout = leg_timeout
+        self.settle_timeout = settle_timeout
+        self.retries = retries
+        self.unwind = unwind
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='order-leg'))
+        self._thread = threading.Thread(target=self.loop.run_forever, name='execution-engine', daemon=True)
+        self._thread.start()
+        setup_logging()
+
+    def execute(self, kalshi_params, polymarket_params, timeout=None):
+        """Place both legs and block until the trade (and any unwind) is settled"""
+        future = asyncio.run_coroutine_threadsafe(self.execute_async(kalshi_params, polymarket_params), self.loop)
+        return future.result(timeout)
+
+    async def _call(self, fn, *args):
+        return await self.loop.run_in_executor(None, fn, *args)
+
+    async def _attempt(self, venue, fn, params, attempt):
+        """
+        Returns:
+            tuple: (response or None, settled); settled is False if the request never came back,
+                   in which case the order may still be live
+        """
+        logger = logging.getLogger(venue)
+        # Threads can't be cancelled, so keep the request and collect its answer even when late
+        task = asyncio.ensure_future(self._call(fn, params))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.leg_timeout), True
+        except asyncio.TimeoutError:
+            metrics.inc('order_errors_total', venue=venue, reason='timeout')
+            logger.error(f"{venue} leg attempt {attempt} missed its {self.leg_timeout}s deadline, waiting for its answer")
+        except Exception as e:
+            metrics.inc('order_errors_total', venue=venue, reason='exception')
+            logger.error(f"{venue} leg attempt {attempt} failed: {e}")
+            return None, True
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.settle_timeout), True
+        except asyncio.TimeoutError:
+            return None, False
+        except Exception as e:
+            logger.error(f"{venue} leg attempt {attempt} failed late: {e}")
+            return None, True
+
+    async def _leg(self, venue, fn, params, filled, lookup, attempt_params=None):
+        """
+        Run one leg until it fills, its retries run out, or its state can't be established.
+
+        Args:
+            lookup: Called with (params, response) after an attempt that did not fill; returns the
+                    order's actual state in the response shape, or None if that is unknown
+            attempt_params: Optional (params, attempt) -> params for each attempt
+        """
+        logger = logging.getLogger(venue)
+        params = dict(params, sent_at=time.time())
+        started = time.perf_counter()
+        response = None
+        state = 'unfilled'
+        attempts = 0
+        for attempts in range(1, self.retries + 2):
+            metrics.inc('order_attempts_total', venue=venue)
+            if attempts > 1:
+                metrics.inc('order_retries_total', venue=venue)
+            current = attempt_params(params, attempts) if attempt_params else params
+            attempt_started = time.perf_counter()
+            response, settled = await self._attempt(venue, fn, current, attempts)
+            metrics.observe('order_attempt_seconds', time.perf_counter() - attempt_started, venue=venue)
+            if not settled:
+                state = 'unknown'
+                logger.error(f"{venue} leg attempt {attempts} never answered, order state unknown")
+                break
+            if filled(response):
+                state = 'filled'
+                break
+
+            # No fill seen: a timeout, a duplicate rejection or an error may still hide one
+            actual = await self._call(lookup, current, response)
+            if actual is None:
+                state = 'unknown'
+                logger.error(f"{venue} leg attempt {attempts} could not be looked up, order state unknown: {response}")
+                break
+            if filled(actual):
+                state = 'filled'
+                response = actual
+                logger.warning(f"{venue} leg attempt {attempts} filled after all: {actual}")
+                break
+            metrics.inc('order_errors_total', venue=venue, reason='unfilled')
+            logger.warning(f"{venue} leg attempt {attempts} did not fill: {response}")
+        latency_ms = (time.perf_counter() - started) * 1000
+        metrics.observe('order_leg_seconds', latency_ms / 1000, venue=venue, state=state)
+        logger.info(f"{venue} leg latency {latency_ms:.1f}ms over {attempts} attempt(s), {state}")
+        return {
+            'response': response,
+            'filled': state == 'filled',
+            'state': state,
+            'attempts': attempts,
+            'latency_ms': latency_ms,
+        }
+
+    @staticmethod
+    def _kalshi_attempt(params, attempt):
+        # A retry only happens once the previous id is known not to have filled
+        if attempt == 1:
+            return params
+        return dict(params, client_order_id=f"{params['client_order_id']}_{attempt}")
+
+    def _kalshi_lookup(self, params, response):
+        """Kalshi's order list can lag the create call, so an attempt that came back without an order is polled for"""
+        deadline = time.monotonic() + (0 if (response or {}).get('order') else self.settle_timeout)
+        while True:
+            actual = get_kalshi_order(params)
+            if (actual and actual['order']) or time.monotonic() >= deadline:
+                return actual
+            time.sleep(KALSHI_LOOKUP_INTERVAL)
+
+    def _kalshi_leg(self, kalshi_params):
+        # The request may run into the settle period, so a late answer is read instead of timing out
+        kalshi_params = dict(kalshi_params, timeout=kalshi_params.get('timeout') or self.leg_timeout + self.settle_timeout)
+        return self._leg('kalshi', execute_kalshi_order, kalshi_params, lambda r: kalshi_filled_contracts(r) > 0,
+                         self._kalshi_lookup, self._kalshi_attempt)
+
+    async def _polymarket_leg(self, polymarket_params):
+        if polymarket_params.get('signed_order') is None:
+            # Sign once so every retry (and a hedge) posts the identical order
+            polymarket_params['signed_order'] = await self._call(sign_polymarket_order, polymarket_params)
+        return await self._leg('polymarket', execute_polymarket_order, polymarket_params, polymarket_filled,
+                               get_polymarket_order_state)
+
+    async def _unwind_kalshi(self, kalshi_params, kalshi):
+        contracts = kalshi_filled_contracts(kalshi['response'])
+        params = dict(kalshi_params, action='sell', count=contracts,
+                      client_order_id=f"{kalshi_params['client_order_id']}_unwind")
+        return await self._kalshi_leg(params)
+
+    async def _unwind_polymarket(self, polymarket_params, polymarket):
+        from py_clob_client.order_builder.constants import SELL
+
+        shares = polymarket_filled_shares(polymarket['response'])
+        if shares <= 0:
+            logging.getLogger('polymarket').error(f"Fill size unknown, unwind manually: {polymarket['response']}")
+            return None
+        params = dict(polymarket_params, side=SELL, amount=shares, signed_order=None, slippage=POLYMARKET_UNWIND_SLIPPAGE)
+        return await self._polymarket_leg(params)
+
+    async def execute_async(self, kalshi_params, polymarket_params):
+        """
+        Returns:
+            dict: 'kalshi' and 'polymarket' leg reports (response, filled, state, attempts, latency_ms),
+                  plus 'hedge' and 'unwind' reports when a lone leg had to be dealt with, and the
+                  trade's 'outcome' (both, hedged, unwound, exposed, none or unknown)
+        """
+        kalshi_params = dict(kalshi_params)
+        polymarket_params = dict(polymarket_params)
+        # Fail before either leg is sent if the Polymarket order could not be bounded
+        polymarket_worst_price(polymarket_params.get('price'))
+        kalshi_params.setdefault('client_order_id', f"{kalshi_params['ticker']}_{uuid.uuid4().hex[:12]}")
+        decided_at = polymarket_params.get('decided_at', time.perf_counter())
+
+        kalshi, polymarket = await asyncio.gather(self._kalshi_leg(kalshi_params), self._polymarket_leg(polymarket_params))
+        result = {'kalshi': kalshi, 'polymarket': polymarket, 'hedge': None, 'unwind': None}
+
+        if 'unknown' in (kalshi['state'], polymarket['state']):
+            # Acting on a guess is how naked positions happen; leave it to the operator
+            logging.error(f"Leg state unknown (kalshi {kalshi['state']}, polymarket {polymarket['state']}), "
+                          f"not hedging or unwinding; check both venues manually")
+            outcome = 'unknown'
+        elif kalshi['filled'] and polymarket['filled']:
+            outcome = 'both'
+        elif kalshi['filled'] or polymarket['filled']:
+            # Leg risk: first try to complete the pair, then sell the filled leg back. The lone
+            # leg's state was looked up, so the hedge can't double a late fill.
+            if kalshi['filled']:
+                logging.warning("Only the Kalshi leg filled, hedging on Polymarket with the original signed order")
+                result['hedge'] = await self._polymarket_leg(polymarket_params)
+            else:
+                logging.warning("Only the Polymarket leg filled, hedging on Kalshi")
+                result['hedge'] = await self._kalshi_leg(
+                    dict(kalshi_params, client_order_id=f"{kalshi_params['client_order_id']}_hedge"))
+
+            outcome = 'hedged' if result['hedge']['filled'] else 'exposed'
+            if result['hedge']['state'] == 'unknown':
+                logging.error("Hedge state unknown, not unwinding; check both venues manually")
+                outcome = 'unknown'
+            elif not result['hedge']['filled'] and self.unwind:
+                if kalshi['filled']:
+                    logging.warning("Hedge failed, unwinding the Kalshi leg")
+                    result['unwind'] = await self._unwind_kalshi(kalshi_params, kalshi)
+                else:
+                    logging.warning("Hedge failed, unwinding the Polymarket leg")
+                    result['unwind'] = await self._unwind_polymarket(polymarket_params, polymarket)
+                if result['unwind'] is not None and result['unwind']['filled']:
+                    outcome = 'unwound'
+        else:
+            outcome = 'none'
+        result['outcome'] = outcome
+
+        settled = time.perf_counter() - decided_at
+        metrics.observe('trade_settle_seconds', settled, outcome=outcome)
+        logging.info(f"Trade settled {settled * 1000:.1f}ms after decision ({outcome}): "
+                     f"kalshi {kalshi['latency_ms']:.1f}ms {kalshi['state']}, "
+                     f"polymarket {polymarket['latency_ms']:.1f}ms {polymarket['state']}")
+        return result
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+_execution_engine = None
+_execution_engine_lock = threading.Lock()
+
+
+def get_execution_engine():
+    """Process-wide ExecutionEngine, started on first use"""
+    global _execution_engine
+    with _execution_engine_lock:
+        if _execution_engine is None:
+            _execution_engine = ExecutionEngine()
+        return _execution_engine
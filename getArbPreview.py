@@ -1,17 +1,14 @@
 import pandas
-import requests
+from venueClient import get_venue_client
+from kalshiToken import resolve_kalshi_token
+import metrics
 import ast
+import numpy as np
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import BookParams
-from py_clob_client.clob_types import OrderArgs, OrderType
-from py_clob_client.order_builder.constants import BUY
-from py_clob_client.constants import POLYGON
-from py_clob_client.clob_types import ApiCreds, MarketOrderArgs
 import dotenv
-from py_clob_client.constants import AMOY
 import os
 
 dotenv.load_dotenv()
@@ -109,6 +106,136 @@ def calculate_arbitrage(kalshi_buy, kalshi_sell, polymarket_buy, polymarket_sell
         },
     }
 
+ARBITRAGE_COLUMNS = [
+    'has_arbitrage', 'yes_market', 'no_market', 'kalshi_allocation', 'polymarket_allocation',
+    'kalshi_contracts', 'total_investment', 'if_yes', 'if_no', 'min_profit', 'max_profit', 'min_roi',
+]
+
+def _round_like_python(values, decimals):
+    """np.round, but matching Python's correctly-rounded round() on values that sit on a .5 boundary"""
+    rounded = np.round(values, decimals)
+    scaled = values * 10 ** decimals
+    ambiguous = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9)
+    for i in ambiguous:
+        rounded[i] = round(float(values[i]), decimals)
+    return rounded
+
+@metrics.timer('calculate_arbitrage_vectorized_seconds')
+def calculate_arbitrage_vectorized(kalshi_buy, kalshi_sell, polymarket_buy, polymarket_sell, stake):
+    """
+    calculate_arbitrage over whole arrays of prices in one pass
+
+    Args:
+        kalshi_buy, kalshi_sell, polymarket_buy, polymarket_sell (array-like): YES/NO asks per pair
+        stake (float or array-like): Total stake amount per pair
+
+    Returns:
+        pd.DataFrame: One row per pair with ARBITRAGE_COLUMNS; rows without arbitrage have
+                      has_arbitrage=False, no markets and NaN amounts
+    """
+    kalshi_buy = np.asarray(kalshi_buy, dtype=float)
+    kalshi_sell = np.asarray(kalshi_sell, dtype=float)
+    polymarket_buy = np.asarray(polymarket_buy, dtype=float)
+    polymarket_sell = np.asarray(polymarket_sell, dtype=float)
+    stake = np.broadcast_to(np.asarray(stake, dtype=float), kalshi_buy.shape)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        worst_yes = np.minimum(kalshi_buy, polymarket_buy)
+        worst_no = np.minimum(kalshi_sell, polymarket_sell)
+        # Ties go to kalshi, as in the scalar version
+        yes_on_kalshi = kalshi_buy == worst_yes
+        no_on_kalshi = kalshi_sell == worst_no
+        possible = (yes_on_kalshi != no_on_kalshi) & (worst_yes + worst_no < 1)
+
+        # Pro rata stakes, scaled so they add up to the stake
+        yes_stake = stake * worst_yes
+        no_stake = stake * worst_no
+        total_investment = yes_stake + no_stake
+        yes_stake = yes_stake * (stake / total_investment)
+        no_stake = no_stake * (stake / total_investment)
+
+        # Kalshi only trades whole contracts
+        kalshi_price = np.where(yes_on_kalshi, kalshi_buy, kalshi_sell)
+        poly_price = np.where(yes_on_kalshi, polymarket_sell, polymarket_buy)
+        original_kalshi_amount = np.where(yes_on_kalshi, yes_stake, no_stake)
+        original_polymarket_amount = np.where(yes_on_kalshi, no_stake, yes_stake)
+        original_kalshi_contracts = original_kalshi_amount / kalshi_price
+        kalshi_contracts = np.round(original_kalshi_contracts)
+        round_rate = kalshi_contracts / original_kalshi_contracts
+        poly_adjusted = original_polymarket_amount * round_rate
+        kalshi_adjusted = original_kalshi_amount * round_rate
+
+        fees = _round_like_python(0.07 * kalshi_contracts * kalshi_price * (1 - kalshi_price), 2)
+        total_investment = kalshi_adjusted + poly_adjusted + fees
+
+        poly_payout = poly_adjusted / poly_price
+        if_yes = np.where(yes_on_kalshi, kalshi_contracts, poly_payout) - total_investment
+        if_no = np.where(yes_on_kalshi, poly_payout, kalshi_contracts) - total_investment
+        min_profit = np.minimum(if_yes, if_no)
+        max_profit = np.maximum(if_yes, if_no)
+        min_roi = np.where(total_investment > 0, min_profit / total_investment * 100, 0.0)
+
+    has_arbitrage = possible & (min_profit >= 0)
+    result = pd.DataFrame({
+        'has_arbitrage': has_arbitrage,
+        'yes_market': np.where(yes_on_kalshi, 'kalshi', 'polymarket'),
+        'no_market': np.where(no_on_kalshi, 'kalshi', 'polymarket'),
+        'kalshi_allocation': kalshi_adjusted,
+        'polymarket_allocation': poly_adjusted,
+        'kalshi_contracts': kalshi_contracts,
+        'total_investment': total_investment,
+        'if_yes': if_yes,
+        'if_no': if_no,
+        'min_profit': min_profit,
+        'max_profit': max_profit,
+        'min_roi': min_roi,
+    })
+    result.loc[~has_arbitrage, ['yes_market', 'no_market']] = None
+    result.loc[~has_arbitrage, ARBITRAGE_COLUMNS[3:]] = np.nan
+    return result
+
+def calculate_arbitrage_table(prices, stake=10):
+    """Run calculate_arbitrage_vectorized over a get_current_prices_batch table, joined to its prices"""
+    result = calculate_arbitrage_vectorized(
+        prices['kalshi_yes_ask'], prices['kalshi_no_ask'],
+        prices['polymarket_yes_ask'], prices['polymarket_no_ask'], stake
+    )
+    result.index = prices.index
+    return pd.concat([prices, result], axis=1)
+
+def arbitrage_row_to_dict(row):
+    """Rebuild the nested calculate_arbitrage dict from a vectorized result row"""
+    if not row['has_arbitrage']:
+        return 'No Arbitrage'
+    return {
+        "optimal_allocation": {
+            "kalshi_allocation": row['kalshi_allocation'],
+            "polymarket_allocation": row['polymarket_allocation'],
+            "kalshi_contracts": int(row['kalshi_contracts']),
+            "total_investment": row['total_investment'],
+        },
+        "market_allocation": {
+            "yes_market": row['yes_market'],
+            "no_market": row['no_market'],
+        },
+        "outcomes": {
+            "if_yes": row['if_yes'],
+            "if_no": row['if_no'],
+            "min_profit": row['min_profit'],
+            "max_profit": row['max_profit'],
+            "min_roi": row['min_roi'],
+        },
+    }
+
+def get_polymarket_tokens(polymarket_id):
+  """Return the (yes, no) CLOB token ids for a Gamma market id"""
+  polymarket_generic_url = "https://gamma-api.polymarket.com/markets/"
+  polymarket_url = polymarket_generic_url+str(polymarket_id)
+  response = get_venue_client().get(url = polymarket_url)
+
+  tokens = ast.literal_eval(response.json()['clobTokenIds'])
+  return tokens[0], tokens[1]
+
 def get_current_prices(kalshi_auth_token, polymarket_client, kalshi_ticker, polymarket_id):
 
   #KALSHI UPDATED MARKET PRICES
@@ -116,13 +243,13 @@ def get_current_prices(kalshi_auth_token, polymarket_client, kalshi_ticker, poly
 
   headers = {
       "accept": "application/json",
-      "Authorization": f"Bearer {kalshi_auth_token}",
+      "Authorization": f"Bearer {resolve_kalshi_token(kalshi_auth_token)}",
       "User-Agent": "curl/8.4.0"
   }
 
 
   kalshi_url = kalshi_generic_url+kalshi_ticker
-  response = requests.get(url = kalshi_url, headers=headers, proxies={'http': None, 'https': None}, verify=True)
+  response = get_venue_client().get(url = kalshi_url, headers=headers, proxies={'http': None, 'https': None}, verify=True)
 
   kalshi_yes_ask = float(response.json()['market']['yes_ask'])/100
   kalshi_no_ask = float(response.json()['market']['no_ask'])/100
@@ -131,14 +258,9 @@ def get_current_prices(kalshi_auth_token, polymarket_client, kalshi_ticker, poly
   #############################
   #GET TOKEN IDS FOR BUY & SELL
   #############################
-  polymarket_generic_url = "https://gamma-api.polymarket.com/markets/"
-  polymarket_url = polymarket_generic_url+str(polymarket_id)
-  response = requests.get(url = polymarket_url)
-
-  tokens = ast.literal_eval(response.json()['clobTokenIds'])
-  polymarket_yes_token = tokens[0]
-  polymarket_no_token = tokens[1]
+  polymarket_yes_token, polymarket_no_token = get_polymarket_tokens(polymarket_id)
 
+  from py_clob_client.clob_types import BookParams
 
   resp = polymarket_client.get_prices(
       params=[
@@ -159,6 +281,103 @@ def get_current_prices(kalshi_auth_token, polymarket_client, kalshi_ticker, poly
   return kalshi_yes_ask, kalshi_no_ask, polymarket_yes_ask, polymarket_no_ask, polymarket_yes_token, polymarket_no_token
 
 
+KALSHI_MARKETS_URL = "https://api.elections.kalshi.com/trade-api/v2/markets"
+GAMMA_MARKETS_URL = "https://gamma-api.polymarket.com/markets"
 
+def chunked(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
 
+def get_kalshi_asks(kalshi_auth_token, tickers):
+    """Yes/no asks (in dollars) for up to ~100 tickers with a single /markets?tickers= call"""
+    headers = {
+        "accept": "application/json",
+        "Authorization": f"Bearer {resolve_kalshi_token(kalshi_auth_token)}",
+        "User-Agent": "curl/8.4.0"
+    }
+    params = {"tickers": ",".join(tickers), "limit": len(tickers)}
+    response = get_venue_client().get(KALSHI_MARKETS_URL, params=params, headers=headers, proxies={'http': None, 'https': None}, verify=True)
+    response.raise_for_status()
+    return {
+        market['ticker']: (float(market['yes_ask']) / 100, float(market['no_ask']) / 100)
+        for market in response.json()['markets']
+    }
+
+def get_polymarket_token_map(polymarket_ids):
+    """(yes, no) CLOB token ids for many Gamma market ids with a single /markets?id=...&id=... call"""
+    params = [("id", str(polymarket_id)) for polymarket_id in polymarket_ids] + [("limit", len(polymarket_ids))]
+    response = get_venue_client().get(GAMMA_MARKETS_URL, params=params)
+    response.raise_for_status()
+    token_map = {}
+    for market in response.json():
+        tokens = ast.literal_eval(market['clobTokenIds'])
+        token_map[str(market['id'])] = (tokens[0], tokens[1])
+    return token_map
+
+def get_polymarket_asks(polymarket_client, token_ids):
+    """Best ask for many CLOB tokens with one get_prices call"""
+    from py_clob_client.clob_types import BookParams
+    resp = polymarket_client.get_prices(params=[BookParams(token_id=token_id, side="SELL") for token_id in token_ids])
+    if not resp:
+        return {}
+    return {token_id: float(resp[token_id]['SELL']) for token_id in token_ids if token_id in resp}
+
+def get_current_prices_batch(kalshi_auth_token, polymarket_client, pairs, chunk_size=100, max_workers=8):
+    """
+    Batched get_current_prices for many pairs using the venues' bulk endpoints.
+
+    Kalshi tickers and Gamma token lookups are fetched concurrently in chunks, then every
+    Polymarket token is priced in chunked get_prices calls, so N pairs cost a handful of
+    requests instead of 3 x N.
 
+    Args:
+        pairs (list): (kalshi_ticker, polymarket_id) tuples
+
+    Returns:
+        pd.DataFrame: One row per pair with the same fields get_current_prices returns
+                      (asks are 0 and tokens None where a venue did not return the market)
+    """
+    tickers = list(dict.fromkeys(ticker for ticker, _ in pairs))
+    polymarket_ids = list(dict.fromkeys(str(polymarket_id) for _, polymarket_id in pairs))
+
+    kalshi_asks = {}
+    token_map = {}
+    polymarket_asks = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        kalshi_futures = [executor.submit(get_kalshi_asks, kalshi_auth_token, chunk) for chunk in chunked(tickers, chunk_size)]
+        token_futures = [executor.submit(get_polymarket_token_map, chunk) for chunk in chunked(polymarket_ids, chunk_size)]
+
+        for future in token_futures:
+            try:
+                token_map.update(future.result())
+            except Exception as e:
+                logging.error(f"Gamma token lookup failed: {e}")
+
+        token_ids = list(dict.fromkeys(token for tokens in token_map.values() for token in tokens))
+        price_futures = [executor.submit(get_polymarket_asks, polymarket_client, chunk) for chunk in chunked(token_ids, chunk_size)]
+
+        for future in kalshi_futures:
+            try:
+                kalshi_asks.update(future.result())
+            except Exception as e:
+                logging.error(f"Kalshi batch price fetch failed: {e}")
+        for future in price_futures:
+            try:
+                polymarket_asks.update(future.result())
+            except Exception as e:
+                logging.error(f"Polymarket batch price fetch failed: {e}")
+
+    rows = []
+    for kalshi_ticker, polymarket_id in pairs:
+        kalshi_yes_ask, kalshi_no_ask = kalshi_asks.get(kalshi_ticker, (0, 0))
+        polymarket_yes_token, polymarket_no_token = token_map.get(str(polymarket_id), (None, None))
+        rows.append({
+            'kalshi_id': kalshi_ticker,
+            'poly_id': polymarket_id,
+            'kalshi_yes_ask': kalshi_yes_ask,
+            'kalshi_no_ask': kalshi_no_ask,
+            'polymarket_yes_ask': polymarket_asks.get(polymarket_yes_token, 0),
+            'polymarket_no_ask': polymarket_asks.get(polymarket_no_token, 0),
+            'polymarket_yes_token': polymarket_yes_token,
+            'polymarket_no_token': polymarket_no_token,
+        })
+    return pd.DataFrame(rows)
@@ -1,19 +1,29 @@
 import json
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
 import pandas as pd
 from datetime import date, datetime
 import logging
 import time
-import os
 from dotenv import load_dotenv
+from catalogStore import CatalogStore
+from snapshots import save_snapshot
+from venueClient import get_venue_client
+from kalshiToken import get_kalshi_token_manager
 
 load_dotenv()
 
 class PolyMarketAPI:
-    def __init__(self):
-        self.BASE_URL = "https://gamma-api.polymarket.com"
+    def __init__(self, base_url="https://gamma-api.polymarket.com", max_in_flight=8):
+        self.BASE_URL = base_url
         self.PAGE_SIZE = 100
+        self.MAX_IN_FLIGHT = max_in_flight
         self.OUTPUT_FILE = 'polymarket_data.csv'
+        self.SNAPSHOT_FILE = 'polymarket_data.arrow'
+
+        # Keep-alive pool shared with every other venue call
+        self.session = get_venue_client()
         
     def _parse_market_data(self, market):
         try:
@@ -44,7 +54,7 @@ class PolyMarketAPI:
                     'has_reviewed_dates': market.get('hasReviewedDates', False),
                     'ready_for_cron': market.get('readyForCron', False),
                     'volume_24hr': float(market.get('volume24hr', 0)),
-                    'clob_token_ids': market.get('clobTokenIds', '[]'),
+                    'clob_token_ids': json.loads(market.get('clobTokenIds') or '[]'),
                     'fpmm_live': market.get('fpmmLive', False),
                     'competitive': float(market.get('competitive', 0)),
                     'spread': float(market.get('spread', 0)),
@@ -58,43 +68,135 @@ class PolyMarketAPI:
             logging.error(f"Error parsing market data: {e}")
             return None
 
-    def get_markets(self):
-        all_markets = []
-        offset = 0
+    def _fetch_page(self, offset, today, **extra_params):
+        params = {
+            'limit': self.PAGE_SIZE,
+            'offset': offset,
+            'end_date_min': today,
+            'active': True,
+            'closed': False
+        }
+        params.update(extra_params)
+        params = {key: value for key, value in params.items() if value is not None}
+        response = self.session.get(f"{self.BASE_URL}/markets", params=params, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def get_markets(self, strict=False):
+        """
+        Fetch every open market, keeping up to MAX_IN_FLIGHT offset pages in flight at once.
+
+        Paging stops at the first empty (or short) page; pages are parsed as they arrive and
+        stitched back together in offset order. A failed page ends the catalog there, or with
+        strict=True raises, so a sync never mistakes a partial catalog for a complete one.
+        """
         today = date.today().isoformat()
+        pages = {}
+        end_offset = None  # first offset known to be past the end of the catalog
+        next_offset = 0
+
+        with ThreadPoolExecutor(max_workers=self.MAX_IN_FLIGHT) as executor:
+            in_flight = {}
+
+            def fill_window():
+                nonlocal next_offset
+                while end_offset is None and len(in_flight) < self.MAX_IN_FLIGHT:
+                    in_flight[executor.submit(self._fetch_page, next_offset, today)] = next_offset
+                    next_offset += self.PAGE_SIZE
+
+            fill_window()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    offset = in_flight.pop(future)
+                    try:
+                        markets = future.result()
+                    except requests.RequestException as e:
+                        logging.error(f"API request failed: {e}")
+                        if strict:
+                            raise
+                        end_offset = offset if end_offset is None else min(end_offset, offset)
+                        continue
+                    except Exception as e:
+                        logging.error(f"Unexpected error: {e}")
+                        if strict:
+                            raise
+                        end_offset = offset if end_offset is None else min(end_offset, offset)
+                        continue
+
+                    if len(markets) < self.PAGE_SIZE:
+                        page_end = offset + self.PAGE_SIZE if markets else offset
+                        end_offset = page_end if end_offset is None else min(end_offset, page_end)
+                    if markets:
+                        pages[offset] = [
+                            data for data in (self._parse_market_data(market) for market in markets)
+                            if data is not None
+                        ]
+                fill_window()
+
+        all_markets = [
+            market
+            for offset in sorted(pages) if end_offset is None or offset < end_offset
+            for market in pages[offset]
+        ]
+        return pd.DataFrame(all_markets)
+
+    def get_markets_updated_since(self, watermark):
+        """
+        Fetch only markets created or updated at/after watermark (an ISO timestamp).
+
+        Pages are requested newest-updated first, without the active/closed filters so that
+        markets which closed since the last sync come through and can be evicted. A failed page
+        raises rather than returning the newer pages alone, which would leave a gap behind the
+        new watermark.
+        """
+        since = pd.to_datetime(watermark, utc=True)
+        today = date.today().isoformat()
+        changed = []
+        offset = 0
 
         while True:
-            try:
-                params = {
-                    'limit': self.PAGE_SIZE,
-                    'offset': offset,
-                    'end_date_min': today,
-                    'active': True,
-                    'closed': False
-                }
-                
-                response = requests.get(f"{self.BASE_URL}/markets", params=params)
-                response.raise_for_status()
-                
-                markets = response.json()
-                if not markets:
-                    break
-                    
-                parsed_markets = [
-                    data for data in (self._parse_market_data(market) for market in markets)
-                    if data is not None
-                ]
-                all_markets.extend(parsed_markets)
-                offset += self.PAGE_SIZE
-                
-            except requests.RequestException as e:
-                logging.error(f"API request failed: {e}")
-                break
-            except Exception as e:
-                logging.error(f"Unexpected error: {e}")
+            markets = self._fetch_page(offset, today, active=None, closed=None, order='updatedAt', ascending=False)
+
+            parsed = [data for data in (self._parse_market_data(market) for market in markets) if data is not None]
+            updated = pd.to_datetime([market['updated_at'] for market in parsed], utc=True, errors='coerce')
+            fresh = [market for market, updated_at in zip(parsed, updated) if updated_at >= since]
+            changed.extend(fresh)
+
+            if len(fresh) < len(parsed) or len(markets) < self.PAGE_SIZE:
                 break
+            offset += self.PAGE_SIZE
 
-        return pd.DataFrame(all_markets)
+        return pd.DataFrame(changed)
+
+    @staticmethod
+    def is_live(markets):
+        """Mask of snapshot rows that are still open for trading"""
+        end_dates = pd.to_datetime(markets['end_date'], errors='coerce')
+        return (
+            markets['active'].astype(bool)
+            & ~markets['closed'].astype(bool)
+            & ~markets['archived'].astype(bool)
+            & (end_dates >= pd.Timestamp(date.today()))
+        )
+
+    def sync(self, store):
+        """Bring the local CatalogStore snapshot up to date and return it (unchanged if the fetch fails)"""
+        watermark = store.watermark
+        try:
+            if watermark is None:
+                changes = self.get_markets(strict=True)
+            else:
+                changes = self.get_markets_updated_since(watermark)
+        except Exception as e:
+            logging.error(f"Polymarket sync failed, keeping the previous snapshot and watermark: {e}")
+            return store.load()
+
+        if not changes.empty:
+            latest = pd.to_datetime(changes['updated_at'], utc=True, errors='coerce').max()
+            if pd.notna(latest):
+                watermark = latest.isoformat()
+        return store.merge(changes, watermark, self.is_live)
 
     def save_to_csv(self, markets_data):
         try:
@@ -105,37 +207,67 @@ class PolyMarketAPI:
             logging.error(f"Error saving to CSV: {e}")
             return 0
 
+    def save_snapshot(self, markets_data):
+        try:
+            return save_snapshot(pd.DataFrame(markets_data), self.SNAPSHOT_FILE)
+        except Exception as e:
+            logging.error(f"Error saving snapshot: {e}")
+            return 0
+
+def build_full_title(markets):
+    """
+    Kalshi display title for every row at once:
+    'title yes_sub_title' if subtitle is empty, "::", or null,
+    'title' if the subtitle is already part of the title,
+    otherwise 'title subtitle'.
+    """
+    title = markets['title'].astype(str)
+    subtitle = markets['subtitle']
+    missing_subtitle = (subtitle.isna() | subtitle.isin(['', '::'])).to_numpy()
+    subtitle = subtitle.fillna('').astype(str)
+
+    subtitle_in_title = np.fromiter(
+        (sub.lower() in full.lower() for sub, full in zip(subtitle, title)),
+        dtype=bool, count=len(markets),
+    )
+    return np.where(
+        missing_subtitle,
+        title + ' ' + markets['yes_sub_title'].astype(str),
+        np.where(subtitle_in_title, title, title + ' ' + subtitle),
+    )
+
 # Kalshi API
 class KalshiAPI:
-    def __init__(self, email, password):
+    def __init__(self, token_manager=None):
+        """
+        Args:
+            token_manager (KalshiTokenManager): Session for the account to list markets with; the
+                                                process-wide KALSHI_EMAIL/KALSHI_PASSWORD one if None
+        """
         self.BASE_URL = "https://trading-api.kalshi.com/trade-api/v2"
         self.MARKETS_URL = "https://api.elections.kalshi.com/trade-api/v2/markets"
-        self.email = email
-        self.password = password
-        self.token = self._get_token()
-    
-    def _get_token(self):
-        payload = {
-            "email": self.email,
-            "password": self.password
-        }
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json"
-        }
-        response = requests.post(f"{self.BASE_URL}/login", json=payload, headers=headers)
-        return response.json()["token"]
+        self.token_manager = token_manager or get_kalshi_token_manager()
+
+    @property
+    def token(self):
+        return self.token_manager.token
     
-    def get_markets(self):
+    def iter_market_pages(self, min_updated_ts=None, strict=False):
+        """
+        Yield each /markets page as a list of raw market records, following the cursor.
+
+        With min_updated_ts only markets updated since then are listed, in any status, so
+        closures show up in a delta sync. A failed request ends the listing, or with
+        strict=True raises, so a sync can tell a partial listing from a complete one.
+        """
         unix = int(time.time())
         cursor = None
-        markets = pd.DataFrame()
-        
+
         headers = {
             "accept": "application/json",
             "Authorization": f"Bearer {self.token}"
         }
-        
+
         while True:
             params = {
                 "limit": 1000,
@@ -143,35 +275,69 @@ class KalshiAPI:
                 "cursor": cursor,
                 "status": "open"
             }
-            
+            if min_updated_ts is not None:
+                params["min_updated_ts"] = min_updated_ts
+                del params["status"]
+
             try:
-                response = requests.get(self.MARKETS_URL, headers=headers, params=params)
+                response = get_venue_client().get(self.MARKETS_URL, headers=headers, params=params)
                 response.raise_for_status()
                 data = response.json()
-                
-                if not data["markets"]:
-                    break
-                    
-                batch = pd.DataFrame.from_dict(data["markets"])
-                markets = pd.concat([markets, batch], ignore_index=True)
-                
-                cursor = data["cursor"]
-                if not cursor:
-                    break
-                    
             except Exception as e:
                 logging.error(f"Error fetching markets: {e}")
+                if strict:
+                    raise
                 break
-        markets['full_title'] = markets.apply(
-            lambda row: (
-                f"{row['title']} {row['yes_sub_title']}"  # Use 'yes_sub_title' if 'subtitle' is empty, "::", or null
-                if (row['subtitle'] == '::' or row['subtitle'] == '' or pd.isnull(row['subtitle'])) else
-                row['title'] if row['subtitle'].lower() in row['title'].lower() else
-                f"{row['title']} {row['subtitle']}"  # Otherwise, use 'title' and 'subtitle'
-            ), axis=1
-        )
+
+            if not data["markets"]:
+                break
+            yield data["markets"]
+
+            cursor = data["cursor"]
+            if not cursor:
+                break
+
+    def iter_markets(self, min_updated_ts=None, strict=False):
+        """Stream the catalog as one DataFrame per page, so downstream stages can start early"""
+        for records in self.iter_market_pages(min_updated_ts, strict):
+            batch = pd.DataFrame.from_records(records)
+            batch['full_title'] = build_full_title(batch)
+            yield batch
+
+    def get_markets(self, strict=False):
+        # Accumulate plain records and build the DataFrame once, instead of concat per page
+        records = []
+        for page in self.iter_market_pages(strict=strict):
+            records.extend(page)
+
+        markets = pd.DataFrame.from_records(records)
+        if markets.empty:
+            return markets
+        markets['full_title'] = build_full_title(markets)
         return markets
-    
+
+    @staticmethod
+    def is_live(markets):
+        """Mask of snapshot rows that are still open for trading"""
+        close_times = pd.to_datetime(markets['close_time'], utc=True, errors='coerce')
+        return markets['status'].isin(['open', 'active']) & (close_times > pd.Timestamp.now(tz='UTC'))
+
+    def sync(self, store, overlap_seconds=60):
+        """Bring the local CatalogStore snapshot up to date and return it (unchanged if the fetch fails)"""
+        sync_started = int(time.time())
+        watermark = store.watermark
+        try:
+            if watermark is None:
+                changes = self.get_markets(strict=True)
+            else:
+                # Small overlap so updates racing the previous sync are not missed; upserts are idempotent
+                batches = list(self.iter_markets(min_updated_ts=int(watermark) - overlap_seconds, strict=True))
+                changes = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+        except Exception as e:
+            logging.error(f"Kalshi sync failed, keeping the previous snapshot and watermark: {e}")
+            return store.load()
+        return store.merge(changes, sync_started, self.is_live)
+
     def save_to_csv(self, df, filename="kalshi_markets.csv"):
         try:
             df.to_csv(filename, index=False)
@@ -179,18 +345,25 @@ class KalshiAPI:
         except Exception as e:
             logging.error(f"Error saving to CSV: {e}")
 
+    def save_snapshot(self, df, filename="kalshi_markets.arrow"):
+        try:
+            save_snapshot(df, filename)
+            logging.info(f"Saved {len(df)} markets to {filename}")
+        except Exception as e:
+            logging.error(f"Error saving snapshot: {e}")
+
 
 def main():
     logging.basicConfig(level=logging.INFO)
     polyMarketApi = PolyMarketAPI()
-    kalshiApi = KalshiAPI(os.getenv("KALSHI_EMAIL"), os.getenv("KALSHI_PASSWORD"))
+    kalshiApi = KalshiAPI()
     
-    logging.info("Fetching market data...")
-    polyMarkets = polyMarketApi.get_markets()
-    kalshiMarkets = kalshiApi.get_markets()
+    logging.info("Syncing market data...")
+    polyMarkets = polyMarketApi.sync(CatalogStore('polymarket', 'id'))
+    kalshiMarkets = kalshiApi.sync(CatalogStore('kalshi', 'ticker'))
     
-    polyMarketApi.save_to_csv(polyMarkets)
-    kalshiApi.save_to_csv(kalshiMarkets)
+    polyMarketApi.save_snapshot(polyMarkets)
+    kalshiApi.save_snapshot(kalshiMarkets)
     logging.info(f"Total markets saved: {len(polyMarkets) + len(kalshiMarkets)}")
 
 if __name__ == "__main__":
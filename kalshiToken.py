@@ -0,0 +1,152 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from venueClient import get_venue_client, KALSHI_LOGIN_HOST
+
+KALSHI_LOGIN_URL = f"{KALSHI_LOGIN_HOST}/trade-api/v2/login"
+TOKEN_CACHE_FILE = '.kalshi_token.json'
+# Kalshi sessions last 30 minutes; the login response does not say so explicitly
+TOKEN_TTL = 30 * 60
+REFRESH_MARGIN = 5 * 60
+
+
+class KalshiTokenManager:
+    """
+    One Kalshi session token per account, shared by every caller in the process.
+
+    The token and its expiry are cached on disk so a restart reuses the last login, and a
+    background thread logs in again REFRESH_MARGIN seconds before expiry so callers on the
+    trade path never wait on /login.
+    """
+
+    def __init__(self, email, password, cache_path=TOKEN_CACHE_FILE, ttl=TOKEN_TTL, refresh_margin=REFRESH_MARGIN):
+        self.email = email
+        self.password = password
+        self.cache_path = Path(cache_path)
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._load()
+
+    @property
+    def _account(self):
+        # The cache file never holds the email itself, only enough to tell accounts apart
+        return hashlib.sha1((self.email or '').encode('utf-8')).hexdigest()
+
+    def _load(self):
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable Kalshi token cache: {e}")
+            return
+        if cached.get('account') == self._account and cached.get('expires_at', 0) > time.time():
+            self._token = cached['token']
+            self._expires_at = cached['expires_at']
+
+    def _save(self):
+        tmp_path = self.cache_path.with_suffix(self.cache_path.suffix + '.tmp')
+        # Owner-only from creation, so the token is never readable by others, even briefly
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'account': self._account, 'token': self._token, 'expires_at': self._expires_at}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _login(self):
+        headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "User-Agent": "curl/8.4.0"
+        }
+        payload = {
+            "email": self.email,
+            "password": self.password
+        }
+        issued_at = time.time()
+        response = get_venue_client().post(KALSHI_LOGIN_URL, json=payload, headers=headers,
+                                           proxies={'http': None, 'https': None}, verify=True)
+        response.raise_for_status()
+        self._token = response.json()["token"]
+        self._expires_at = issued_at + self.ttl
+        try:
+            self._save()
+        except OSError as e:
+            logging.warning(f"Could not cache Kalshi token: {e}")
+        logging.info(f"Kalshi login, token valid until {time.strftime('%H:%M:%S', time.localtime(self._expires_at))}")
+
+    def refresh(self):
+        """Log in again now, regardless of the current token's expiry"""
+        with self._lock:
+            self._login()
+            return self._token
+
+    def invalidate(self):
+        """Forget the current token, e.g. after a 401, so the next access logs in"""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0
+
+    @property
+    def token(self):
+        """A valid token, logging in only if there is none or it is about to expire"""
+        with self._lock:
+            if self._token is None or time.time() >= self._expires_at - self.refresh_margin:
+                self._login()
+            return self._token
+
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            delay = self._expires_at - self.refresh_margin - time.time()
+            if delay > 0:
+                self._stop_event.wait(delay)
+                continue
+            try:
+                # A caller may have logged in since the delay was computed (e.g. on a cold start)
+                self.token
+            except Exception as e:
+                logging.error(f"Background Kalshi login failed, retrying: {e}")
+                self._stop_event.wait(30)
+
+    def start(self):
+        """Keep the token fresh from a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name='kalshi-token', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_token_manager = None
+_token_manager_lock = threading.Lock()
+
+
+def get_kalshi_token_manager():
+    """Process-wide token manager for KALSHI_EMAIL, refreshing in the background"""
+    global _token_manager
+    with _token_manager_lock:
+        if _token_manager is None:
+            _token_manager = KalshiTokenManager(os.getenv("KALSHI_EMAIL"), os.getenv("KALSHI_PASSWORD")).start()
+        return _token_manager
+
+
+def resolve_kalshi_token(kalshi_auth_token=None):
+    """The token passed in, or the shared manager's current token when None"""
+    return kalshi_auth_token or get_kalshi_token_manager().token
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+
+LLM_VERDICT_CACHE_FILE = 'llm_verdicts.sqlite'
+LLM_MODEL = 'gpt-4o-mini'
+
+SYSTEM_PROMPT = "You are a careful analyst of prediction markets."
+BATCH_PROMPT = (
+    "For each numbered pair of questions below, decide whether the two questions are identical, "
+    "meaning there is no possibility that they have different results.\n"
+    "Reply with only a JSON array of \"Yes\" or \"No\" strings, one per pair, in order.\n\n"
+)
+
+
+def normalize_question(text):
+    """Lowercase, collapse whitespace and drop trailing punctuation, so cosmetic edits hit the cache"""
+    text = re.sub(r'\s+', ' ', str(text or '')).strip().lower()
+    return text.rstrip(' ?.!')
+
+
+def pair_key(model, question_1, question_2):
+    """Cache key of a question pair (order-insensitive) for one model"""
+    first, second = sorted((normalize_question(question_1), normalize_question(question_2)))
+    return hashlib.sha1(f"{model}\x1f{first}\x1f{second}".encode('utf-8')).hexdigest()
+
+
+class TokenBucket:
+    """Async token bucket: at most `rate` acquisitions per second on average, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class LLMVerifier:
+    """
+    Asks an OpenAI-compatible chat endpoint whether candidate pairs are the same market.
+
+    Pairs are deduplicated and looked up in a SQLite verdict cache first, so a pair is only
+    ever paid for once per model. The rest are sent batch_size pairs per prompt, with at most
+    max_concurrency requests in flight and requests_per_second enforced by a token bucket.
+    Failed or unparseable batches are retried with backoff; pairs that still fail get no
+    verdict (None) and are not cached.
+    """
+
+    def __init__(self, model=LLM_MODEL, base_url=None, api_key=None, batch_size=10, max_concurrency=4,
+                 requests_per_second=2, retries=3, cache_path=LLM_VERDICT_CACHE_FILE):
+        """
+        Args:
+            base_url (str): OpenAI-compatible endpoint (OPENAI_BASE_URL / the OpenAI API if None)
+            api_key (str): Defaults to OPENAI_API_KEY
+        """
+        self.model = model
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.retries = retries
+        self.stats = {'cached': 0, 'requests': 0, 'retries': 0, 'verified': 0, 'failed': 0}
+        self._client = None
+
+        self._db = sqlite3.connect(cache_path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                question_1 TEXT,
+                question_2 TEXT,
+                is_match INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def cached_verdicts(self, keys):
+        """{key: bool} for the keys already in the verdict cache"""
+        verdicts = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for key, is_match in self._db.execute(
+                    f"SELECT key, is_match FROM verdicts WHERE key IN ({placeholders})", chunk):
+                verdicts[key] = bool(is_match)
+        return verdicts
+
+    def _store(self, rows):
+        self._db.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?)",
+                             [(key, self.model, q1, q2, int(is_match), time.time()) for key, q1, q2, is_match in rows])
+        self._db.commit()
+
+    @staticmethod
+    def _parse(content, expected):
+        match = re.search(r'\[.*\]', content or '', re.S)
+        if not match:
+            raise ValueError(f"No JSON array in reply: {content!r}")
+        answers = json.loads(match.group(0))
+        if len(answers) != expected:
+            raise ValueError(f"Expected {expected} verdicts, got {len(answers)}")
+        return [str(answer).strip().lower().startswith('y') for answer in answers]
+
+    async def _ask(self, batch, semaphore, bucket):
+        """Verdicts for one batch of (key, question_1, question_2), or None after exhausting retries"""
+        prompt = BATCH_PROMPT + "\n".join(
+            f"{n}. A: {question_1}\n   B: {question_2}" for n, (_, question_1, question_2) in enumerate(batch, 1)
+        )
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                await asyncio.sleep(min(30, 2 ** attempt))
+            await bucket.acquire()
+            try:
+                async with semaphore:
+                    self.stats['requests'] += 1
+                    completion = await self.client.chat.completions.create(
+                        model=self.model,
+                        temperature=0,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ]
+                    )
+                return self._parse(completion.choices[0].message.content, len(batch))
+            except Exception as e:
+                logging.warning(f"LLM batch of {len(batch)} failed (attempt {attempt + 1}): {e}")
+        return None
+
+    async def verify(self, pairs, question_1='poly_question', question_2='kalshi_title'):
+        """
+        Add an 'llm_match' column (True, False, or None when no verdict could be obtained).
+
+        Args:
+            pairs (pd.DataFrame): Candidate pairs with the two question columns
+        """
+        pairs = pairs.copy()
+        keys = [pair_key(self.model, q1, q2) for q1, q2 in zip(pairs[question_1], pairs[question_2])]
+        verdicts = self.cached_verdicts(set(keys))
+        self.stats['cached'] += len(verdicts)
+
+        todo = {}
+        for key, q1, q2 in zip(keys, pairs[question_1], pairs[question_2]):
+            if key not in verdicts and key not in todo:
+                todo[key] = (key, q1, q2)
+        todo = list(todo.values())
+        batches = [todo[start:start + self.batch_size] for start in range(0, len(todo), self.batch_size)]
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        bucket = TokenBucket(self.requests_per_second)
+        results = await asyncio.gather(*(self._ask(batch, semaphore, bucket) for batch in batches))
+
+        for batch, answers in zip(batches, results):
+            if answers is None:
+                self.stats['failed'] += len(batch)
+                continue
+            self._store([(key, q1, q2, answer) for (key, q1, q2), answer in zip(batch, answers)])
+            verdicts.update({key: answer for (key, _, _), answer in zip(batch, answers)})
+            self.stats['verified'] += len(batch)
+
+        pairs['llm_match'] = [verdicts.get(key) for key in keys]
+        logging.info(f"LLM verification: {self.stats}")
+        return pairs
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,196 @@
+import argparse
+import atexit
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Seconds; spans a sub-millisecond arbitrage evaluation up to a slow catalog page
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and latency histograms.
+
+    Every update is also appended to a JSONL event log when one is configured (METRICS_FILE),
+    which is what the summary command reads; serve_prometheus() exposes the live aggregates.
+    """
+
+    def __init__(self, jsonl_path=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._log = None
+        if jsonl_path:
+            self.open_log(jsonl_path)
+
+    def open_log(self, path):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            self._log = open(path, 'a')
+        atexit.register(self.flush)
+
+    def flush(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+
+    def _write(self, kind, name, value, labels):
+        if self._log is not None:
+            self._log.write(json.dumps({'ts': time.time(), 'type': kind, 'name': name, 'value': value, 'labels': labels}) + "\n")
+
+    def inc(self, name, value=1, **labels):
+        """Add value to the counter name{labels}"""
+        with self._lock:
+            self.counters[(name, _label_key(labels))] += value
+            self._write('counter', name, value, labels)
+
+    def observe(self, name, seconds, **labels):
+        """Record one latency sample in the histogram name{labels}"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'count': 0, 'sum': 0.0, 'buckets': [0] * len(self.buckets)}
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+            for n, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][n] += 1
+                    break
+            self._write('timer', name, seconds, labels)
+
+    def timer(self, name, **labels):
+        """Context manager / decorator that observes its wall time under name{labels}"""
+        return Timer(self, name, labels)
+
+    def prometheus_text(self):
+        """Current state in the Prometheus text exposition format"""
+        def render(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}' if pairs else ''
+
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{name}{render(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{render(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{render(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{render(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{render(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class Timer(contextlib.ContextDecorator):
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # A fresh timer per decorated call, so concurrent calls don't share a start time
+        return Timer(self.registry, self.name, self.labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        self.registry.observe(self.name, self.elapsed, **self.labels)
+        if exc_type is not None:
+            self.registry.inc(f"{self.name.rsplit('_seconds', 1)[0]}_errors_total", **self.labels)
+        return False
+
+
+registry = MetricsRegistry(os.getenv("METRICS_FILE"))
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+
+
+def serve_prometheus(port=None, host='127.0.0.1'):
+    """Expose /metrics on a daemon thread (port defaults to METRICS_PORT); call it from a main(), never at import"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    port = int(port or os.getenv("METRICS_PORT", 9464))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def summarize(path, since=None):
+    """Per-metric counts and latency percentiles from a JSONL event log"""
+    timers = defaultdict(list)
+    counters = defaultdict(float)
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if since is not None and event['ts'] < since:
+                continue
+            labels = ','.join(f"{key}={value}" for key, value in sorted(event['labels'].items()))
+            key = f"{event['name']}{{{labels}}}" if labels else event['name']
+            if event['type'] == 'timer':
+                timers[key].append(event['value'])
+            else:
+                counters[key] += event['value']
+
+    if timers:
+        print(f"{'timer':<60} {'count':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} {'total s':>10}")
+        for key, values in sorted(timers.items(), key=lambda item: -sum(item[1])):
+            values = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            print(f"{key:<60} {len(values):>8} {p50:>10.3f} {p95:>10.3f} {p99:>10.3f} {values.max():>10.3f} {values.sum() / 1000:>10.2f}")
+    if counters:
+        print(f"\n{'counter':<60} {'total':>10}")
+        for key, value in sorted(counters.items()):
+            print(f"{key:<60} {value:>10g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect recorded latency metrics")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summary_parser = subparsers.add_parser('summary', help="latency percentiles and counter totals from a METRICS_FILE log")
+    summary_parser.add_argument('path', nargs='?', default=os.getenv("METRICS_FILE", 'metrics.jsonl'))
+    summary_parser.add_argument('--last', type=float, help="only events from the last N seconds")
+
+    args = parser.parse_args()
+    if args.command == 'summary':
+        summarize(args.path, since=time.time() - args.last if args.last else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import logging
+import numpy as np
+
+from venueClient import get_venue_client
+from kalshiToken import resolve_kalshi_token
+
+KALSHI_MARKETS_URL = "https://api.elections.kalshi.com/trade-api/v2/markets"
+KALSHI_FEE_RATE = 0.07
+
+
+def _ladder(levels):
+    """(prices, sizes) float arrays sorted by ascending price, empty levels dropped"""
+    levels = np.asarray(levels, dtype=float).reshape(-1, 2)
+    levels = levels[levels[:, 1] > 0]
+    order = np.argsort(levels[:, 0], kind='stable')
+    return levels[order, 0], levels[order, 1]
+
+
+def kalshi_ask_ladders(orderbook):
+    """
+    Kalshi only publishes bids; a NO bid at c cents is a YES ask at (100 - c) cents and vice versa.
+
+    Args:
+        orderbook (dict): The 'orderbook' object from GET /markets/{ticker}/orderbook
+
+    Returns:
+        tuple: (yes_asks, no_asks) as lists of (price in dollars, contracts)
+    """
+    yes_bids = orderbook.get('yes') or []
+    no_bids = orderbook.get('no') or []
+    yes_asks = [((100 - cents) / 100, quantity) for cents, quantity in no_bids]
+    no_asks = [((100 - cents) / 100, quantity) for cents, quantity in yes_bids]
+    return yes_asks, no_asks
+
+
+def polymarket_ask_ladder(order_book):
+    """Asks from a CLOB order book summary (object or dict) as (price, shares)"""
+    asks = order_book['asks'] if isinstance(order_book, dict) else order_book.asks
+    ladder = []
+    for level in asks:
+        if isinstance(level, dict):
+            ladder.append((float(level['price']), float(level['size'])))
+        else:
+            ladder.append((float(level.price), float(level.size)))
+    return ladder
+
+
+def get_order_book_ladders(kalshi_auth_token, polymarket_client, kalshi_ticker, polymarket_yes_token, polymarket_no_token, depth=100):
+    """Fetch both venues' books for one pair and return the four ask ladders"""
+    headers = {
+        "accept": "application/json",
+        "Authorization": f"Bearer {resolve_kalshi_token(kalshi_auth_token)}",
+        "User-Agent": "curl/8.4.0"
+    }
+    response = get_venue_client().get(f"{KALSHI_MARKETS_URL}/{kalshi_ticker}/orderbook", params={"depth": depth},
+                                      headers=headers, proxies={'http': None, 'https': None}, verify=True)
+    response.raise_for_status()
+    kalshi_yes_asks, kalshi_no_asks = kalshi_ask_ladders(response.json()['orderbook'])
+
+    poly_yes_asks = polymarket_ask_ladder(polymarket_client.get_order_book(polymarket_yes_token))
+    poly_no_asks = polymarket_ask_ladder(polymarket_client.get_order_book(polymarket_no_token))
+    return kalshi_yes_asks, kalshi_no_asks, poly_yes_asks, poly_no_asks
+
+
+def kalshi_fee(contracts, price):
+    """Same per-fill fee estimate calculate_arbitrage uses"""
+    return round(KALSHI_FEE_RATE * contracts * price * (1 - price), 2)
+
+
+def _aggregate_fills(prices, quantities):
+    levels, inverse = np.unique(prices, return_inverse=True)
+    totals = np.bincount(inverse, weights=quantities, minlength=len(levels))
+    return dict(zip(levels.tolist(), totals.tolist()))
+
+
+def _walk_books(kalshi_asks, poly_asks, max_stake=None, max_contracts=None):
+    """
+    Walk a Kalshi ladder and a Polymarket ladder together, one contract of each per hedged unit.
+
+    The books are cut into segments where both venues' marginal price is constant. Marginal
+    profit per unit (1 - kalshi - poly - fee) only falls as we go deeper, so every segment
+    with positive marginal profit is taken, subject to the stake and contract caps.
+
+    Returns:
+        tuple: (contracts, kalshi_fills, poly_fills) with fills as {price: quantity}
+    """
+    kalshi_prices, kalshi_sizes = _ladder(kalshi_asks)
+    poly_prices, poly_sizes = _ladder(poly_asks)
+    if not len(kalshi_prices) or not len(poly_prices):
+        return 0, {}, {}
+
+    kalshi_depth = np.cumsum(kalshi_sizes)
+    poly_depth = np.cumsum(poly_sizes)
+    limit = min(kalshi_depth[-1], poly_depth[-1])
+    if max_contracts is not None:
+        limit = min(limit, max_contracts)
+
+    ends = np.unique(np.concatenate([kalshi_depth, poly_depth, [limit]]))
+    ends = ends[ends <= limit]
+    starts = np.concatenate([[0.0], ends[:-1]])
+    quantities = ends - starts
+
+    kalshi_level = np.searchsorted(kalshi_depth, starts, side='right')
+    poly_level = np.searchsorted(poly_depth, starts, side='right')
+    kalshi_price = kalshi_prices[kalshi_level]
+    poly_price = poly_prices[poly_level]
+    unit_cost = kalshi_price + poly_price + KALSHI_FEE_RATE * kalshi_price * (1 - kalshi_price)
+
+    # Profitable segments form a prefix because unit cost never decreases with depth
+    profitable = np.logical_and.accumulate(unit_cost < 1)
+    quantities = np.where(profitable, quantities, 0.0)
+
+    if max_stake is not None:
+        spent_before = np.concatenate([[0.0], np.cumsum(quantities * unit_cost)[:-1]])
+        affordable = np.clip((max_stake - spent_before) / unit_cost, 0, None)
+        quantities = np.minimum(quantities, affordable)
+
+    # Kalshi fills whole contracts only
+    contracts = int(np.floor(quantities.sum() + 1e-9))
+    taken = np.minimum(quantities, np.clip(contracts - np.concatenate([[0.0], np.cumsum(quantities)[:-1]]), 0, None))
+
+    used = taken > 0
+    kalshi_fills = _aggregate_fills(kalshi_price[used], taken[used])
+    poly_fills = _aggregate_fills(poly_price[used], taken[used])
+    return contracts, kalshi_fills, poly_fills
+
+
+def size_arbitrage(kalshi_yes_asks, kalshi_no_asks, poly_yes_asks, poly_no_asks, max_stake=None, max_contracts=None):
+    """
+    Depth-aware counterpart of calculate_arbitrage.
+
+    Tries both directions (YES on Kalshi + NO on Polymarket, and the reverse), walks the two
+    relevant ask ladders together and returns the size with the largest guaranteed profit after
+    Kalshi fees and whole-contract rounding, with a price-level fill plan for each leg.
+
+    Args:
+        kalshi_yes_asks, kalshi_no_asks, poly_yes_asks, poly_no_asks (list): (price, size) ask levels
+        max_stake (float): Optional cap on total investment including fees
+        max_contracts (int): Optional cap on hedged contracts
+
+    Returns:
+        dict: Same shape as calculate_arbitrage plus 'fill_plan', or 'No Arbitrage'
+    """
+    best = None
+    directions = [
+        ('kalshi', 'polymarket', kalshi_yes_asks, poly_no_asks),
+        ('polymarket', 'kalshi', kalshi_no_asks, poly_yes_asks),
+    ]
+    for yes_market, no_market, kalshi_asks, poly_asks in directions:
+        contracts, kalshi_fills, poly_fills = _walk_books(kalshi_asks, poly_asks, max_stake, max_contracts)
+        if contracts <= 0:
+            continue
+
+        kalshi_cost = sum(price * quantity for price, quantity in kalshi_fills.items())
+        poly_cost = sum(price * quantity for price, quantity in poly_fills.items())
+        fees = sum(kalshi_fee(quantity, price) for price, quantity in kalshi_fills.items())
+        total_investment = kalshi_cost + poly_cost + fees
+        # Exactly one leg pays out $1 per contract whichever way the market resolves
+        profit = contracts - total_investment
+        if profit <= 0 or (best is not None and profit <= best['outcomes']['min_profit']):
+            continue
+
+        best = {
+            "optimal_allocation": {
+                "kalshi_allocation": kalshi_cost,
+                "polymarket_allocation": poly_cost,
+                "kalshi_contracts": contracts,
+                "total_investment": total_investment,
+            },
+            "market_allocation": {
+                "yes_market": yes_market,
+                "no_market": no_market,
+            },
+            "outcomes": {
+                "if_yes": profit,
+                "if_no": profit,
+                "min_profit": profit,
+                "max_profit": profit,
+                "min_roi": (profit / total_investment) * 100 if total_investment > 0 else 0,
+            },
+            "fill_plan": {
+                "kalshi": [{"price": price, "contracts": int(round(quantity))} for price, quantity in sorted(kalshi_fills.items())],
+                "polymarket": [{"price": price, "shares": quantity} for price, quantity in sorted(poly_fills.items())],
+                "kalshi_limit_price": max(kalshi_fills),
+                "polymarket_limit_price": max(poly_fills),
+                "fees": fees,
+            },
+        }
+
+    if best is None:
+        logging.debug("No depth-aware arbitrage in either direction")
+        return 'No Arbitrage'
+    return best
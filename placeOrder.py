@@ -1,133 +1,284 @@
 import json
-import requests
+from venueClient import get_order_client, KALSHI_API_HOST
+from kalshiToken import get_kalshi_token_manager, resolve_kalshi_token
 from datetime import datetime, date
 import os
-from py_clob_client.clob_types import OrderArgs, OrderType, ApiCreds, MarketOrderArgs
-from py_clob_client.order_builder.constants import BUY
-from py_clob_client.client import ClobClient
-from py_clob_client.constants import POLYGON, AMOY
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor
 import logging
+import threading
+import time
 from pathlib import Path
 
 # Load environment variables at startup
 load_dotenv()
 
+# Overridable so the execution path can be pointed at a local mock exchange
+KALSHI_ORDERS_URL = os.getenv("KALSHI_ORDERS_URL", f"{KALSHI_API_HOST}/trade-api/v2/portfolio/orders")
+# How far past the reviewed price a Polymarket market order may fill, and the wider bound used
+# when selling back a lone leg, where getting out matters more than the price
+POLYMARKET_SLIPPAGE = float(os.getenv("POLYMARKET_SLIPPAGE", "0.01"))
+POLYMARKET_UNWIND_SLIPPAGE = float(os.getenv("POLYMARKET_UNWIND_SLIPPAGE", "0.05"))
+
+def _add_file_handler(logger, path, formatter):
+    path = os.path.abspath(path)
+    if any(getattr(handler, 'baseFilename', None) == path for handler in logger.handlers):
+        return
+    handler = logging.FileHandler(path)
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
 def setup_logging():
-    """Setup logging directories and formats"""
+    """Setup logging directories and formats (safe to call repeatedly)"""
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
     
-    # Create separate log files for each exchange
-    kalshi_handler = logging.FileHandler(f"logs/kalshi_orders_{datetime.now().strftime('%Y%m%d')}.log")
-    poly_handler = logging.FileHandler(f"logs/polymarket_orders_{datetime.now().strftime('%Y%m%d')}.log")
-    
     formatter = logging.Formatter('%(asctime)s - %(message)s')
-    kalshi_handler.setFormatter(formatter)
-    poly_handler.setFormatter(formatter)
-    
-    # Setup individual loggers
+
+    # Setup individual loggers, each with its own daily log file
     kalshi_logger = logging.getLogger('kalshi')
     poly_logger = logging.getLogger('polymarket')
     
-    kalshi_logger.addHandler(kalshi_handler)
-    poly_logger.addHandler(poly_handler)
+    _add_file_handler(kalshi_logger, f"logs/kalshi_orders_{datetime.now().strftime('%Y%m%d')}.log", formatter)
+    _add_file_handler(poly_logger, f"logs/polymarket_orders_{datetime.now().strftime('%Y%m%d')}.log", formatter)
     
     kalshi_logger.setLevel(logging.INFO)
     poly_logger.setLevel(logging.INFO)
     
     return kalshi_logger, poly_logger
 
-def execute_polymarket_order(polymarket_params):
+class PolymarketOrderPreparer:
     """
-    Execute a Polymarket order with configurable parameters
+    Builds and signs candidate Polymarket orders in the background while an opportunity is on screen.
+
+    Tick size and neg-risk lookups and the EIP-712 signature all happen here, so the execute path
+    only has to post_order. Prepared orders are single use and expire after max_age seconds.
     """
-    logger = logging.getLogger('polymarket')
 
-    client = polymarket_params['client']
-    
+    def __init__(self, client, max_age=30, max_workers=2):
+        self.client = client
+        self.max_age = max_age
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token_id, amount, price):
+        return token_id, round(float(amount), 2), round(float(price), 4)
+
+    def _sign(self, token_id, amount, price):
+        from py_clob_client.clob_types import MarketOrderArgs, PartialCreateOrderOptions
+        options = PartialCreateOrderOptions(
+            tick_size=self.client.get_tick_size(token_id),
+            neg_risk=self.client.get_neg_risk(token_id),
+        )
+        order_args = MarketOrderArgs(token_id=token_id, amount=amount, price=polymarket_worst_price(price))
+        return self.client.create_market_order(order_args, options)
+
+    def prepare(self, token_id, amounts, price):
+        """Start signing one order per candidate amount; price (the displayed ask) plus slippage bounds the fill"""
+        for amount in amounts:
+            key = self._key(token_id, amount, price)
+            with self._lock:
+                if key in self._orders:
+                    continue
+                self._orders[key] = (self._executor.submit(self._sign, token_id, amount, price), time.monotonic())
+
+    def take(self, token_id, amount, price, wait=0.5):
+        """Pop a ready, fresh signed order for exactly this amount and price, or None to sign on the spot"""
+        with self._lock:
+            entry = self._orders.pop(self._key(token_id, amount, price), None)
+        if entry is None:
+            return None
+        future, created = entry
+        if time.monotonic() - created > self.max_age:
+            return None
+        try:
+            return future.result(timeout=wait)
+        except Exception as e:
+            logging.getLogger('polymarket').warning(f"Pre-signed order unavailable: {e}")
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._orders.clear()
+
+def polymarket_worst_price(price, side='BUY', slippage=POLYMARKET_SLIPPAGE):
+    """Worst fill price for a market order: the reviewed price plus slippage for a BUY, minus it for a SELL"""
+    if price is None or not 0 < float(price) < 1:
+        raise ValueError(f"Refusing to sign a Polymarket market order without a valid reference price: {price}")
+    if side == 'SELL':
+        return round(max(0.01, float(price) - slippage), 4)
+    return round(min(0.99, float(price) + slippage), 4)
+
+def sign_polymarket_order(polymarket_params):
+    """
+    Build and sign the market order described by polymarket_params.
+
+    'amount' is dollars for a BUY and shares for a SELL ('side', default BUY). 'price' is the
+    reviewed price; the order won't fill beyond it by more than 'slippage'.
+    """
+    from py_clob_client.clob_types import MarketOrderArgs
+    from py_clob_client.order_builder.constants import BUY
+
+    logger = logging.getLogger('polymarket')
+    side = polymarket_params.get('side', BUY)
     order_args = MarketOrderArgs(
         token_id=polymarket_params['token_id'],
-        amount=polymarket_params['amount']
+        amount=polymarket_params['amount'],
+        side=side,
+        price=polymarket_worst_price(polymarket_params.get('price'), side,
+                                     polymarket_params.get('slippage', POLYMARKET_SLIPPAGE))
     )
     logger.info(f"Order Args: {order_args}")
-    signed_order = client.create_market_order(order_args)
+    return polymarket_params['client'].create_market_order(order_args)
+
+def execute_polymarket_order(polymarket_params):
+    """
+    Execute a Polymarket order with configurable parameters
+    """
+    from py_clob_client.clob_types import OrderType
+
+    logger = logging.getLogger('polymarket')
+
+    client = polymarket_params['client']
+    decided_at = polymarket_params.get('decided_at', time.perf_counter())
+
+    signed_order = polymarket_params.get('signed_order')
+    presigned = signed_order is not None
+    if not presigned:
+        signed_order = sign_polymarket_order(polymarket_params)
+
+    on_wire = time.perf_counter()
     resp = client.post_order(signed_order, orderType=OrderType.FOK)
+    done = time.perf_counter()
+    logger.info(f"Order Latency: decision->wire {(on_wire - decided_at) * 1000:.1f}ms, "
+                f"post_order {(done - on_wire) * 1000:.1f}ms, presigned={presigned}")
     logger.info(f"Order Response: {json.dumps(resp, indent=2)}")
     return resp
 
+def _kalshi_headers(kalshi_params, token=None):
+    return {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "Authorization": f"Bearer {token or resolve_kalshi_token(kalshi_params.get('auth_token'))}",
+        "User-Agent": "curl/8.4.0"
+    }
+
 def execute_kalshi_order(kalshi_params):
     """
     Execute a Kalshi order with configurable parameters
     """
     logger = logging.getLogger('kalshi')
-    logger.info(f"Kalshi Params: {kalshi_params}")
+    logged_params = {key: value for key, value in kalshi_params.items() if key != 'auth_token'}
+    logger.info(f"Kalshi Params: {logged_params}")
     order_type = "market"
     
 
     try:
-        url = "https://api.elections.kalshi.com/trade-api/v2/portfolio/orders"
+        url = kalshi_params.get('url', KALSHI_ORDERS_URL)
+        # The engine passes its leg deadline plus settle period, so a slow answer is read rather than dropped
+        timeout = kalshi_params.get('timeout') or get_order_client().timeout
         payload = {
-            "action": "buy",
-            "client_order_id": f"{kalshi_params['ticker']}_{datetime.now().strftime('%Y-%m-%d')}",
+            "action": kalshi_params.get('action', 'buy'),
+            "client_order_id": kalshi_params.get('client_order_id', f"{kalshi_params['ticker']}_{datetime.now().strftime('%Y-%m-%d')}"),
             "ticker": kalshi_params['ticker'],
             "count": int(kalshi_params['count']),
             "type": order_type,
             "side": kalshi_params['side']
         }
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "Authorization": f"Bearer {kalshi_params['auth_token']}",
-            "User-Agent": "curl/8.4.0"
-        }
+        headers = _kalshi_headers(kalshi_params)
         logger.info(f"Order Payload: {json.dumps(payload, indent=2)}")
-        logger.info(f"Order Headers: {headers}")
         
-        response = requests.post(url, json=payload, headers=headers, proxies={'http': None, 'https': None}, verify=True).json()
+        response = get_order_client().post(url, json=payload, headers=headers, timeout=timeout, proxies={'http': None, 'https': None}, verify=True)
+        if response.status_code == 401:
+            # Token expired under us; log in once and resend the same client_order_id
+            logger.warning("Kalshi token rejected, refreshing and retrying")
+            headers = _kalshi_headers(kalshi_params, get_kalshi_token_manager().refresh())
+            response = get_order_client().post(url, json=payload, headers=headers, timeout=timeout, proxies={'http': None, 'https': None}, verify=True)
+        response = response.json()
         logger.info(f"Order Response: {json.dumps(response, indent=2)}")
         return response
     except Exception as e:
         logger.error(f"Order Failed: {str(e)}")
         return None
 
+def get_kalshi_order(kalshi_params):
+    """
+    Look up the order placed with kalshi_params' client_order_id.
+
+    Returns:
+        dict: {'order': order} in the create-order response shape (order is None when Kalshi
+              has no order with that id), or None when the lookup itself failed
+    """
+    logger = logging.getLogger('kalshi')
+    client_order_id = kalshi_params['client_order_id']
+    try:
+        response = get_order_client().get(
+            kalshi_params.get('url', KALSHI_ORDERS_URL),
+            params={'ticker': kalshi_params['ticker']},
+            headers=_kalshi_headers(kalshi_params),
+            timeout=kalshi_params.get('timeout') or get_order_client().timeout,
+        )
+        response.raise_for_status()
+        orders = response.json().get('orders') or []
+    except Exception as e:
+        logger.error(f"Order lookup for {client_order_id} failed: {e}")
+        return None
+    order = next((order for order in orders if order.get('client_order_id') == client_order_id), None)
+    logger.info(f"Order lookup for {client_order_id}: {order}")
+    return {'order': order}
+
+def get_polymarket_order_state(polymarket_params, response=None):
+    """
+    Look up whether a posted order filled: by order id when the post answered, otherwise by
+    this account's trades on the token since polymarket_params['sent_at'] (epoch seconds).
+
+    Returns:
+        dict: post_order-shaped {'success', 'status', 'takingAmount', 'orderID'}, or None when
+              the lookup itself failed
+    """
+    logger = logging.getLogger('polymarket')
+    client = polymarket_params['client']
+    order_id = (response or {}).get('orderID')
+    try:
+        if order_id:
+            order = client.get_order(order_id) or {}
+            shares = float(order.get('size_matched') or 0)
+        else:
+            from py_clob_client.clob_types import TradeParams
+            trades = client.get_trades(TradeParams(asset_id=polymarket_params['token_id'],
+                                                   after=int(polymarket_params['sent_at']) - 1))
+            shares = sum(float(trade.get('size') or 0) for trade in trades if trade.get('status') != 'FAILED')
+    except Exception as e:
+        logger.error(f"Order lookup failed: {e}")
+        return None
+    state = {'success': shares > 0, 'status': 'matched' if shares > 0 else 'unmatched',
+             'takingAmount': shares, 'orderID': order_id}
+    logger.info(f"Order lookup: {state}")
+    return state
+
 def execute_order(kalshi_params, polymarket_params):
-    """Executes orders on both Kalshi and Polymarket in parallel using threads"""
-    kalshi_logger, poly_logger = setup_logging()
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        kalshi_future = executor.submit(execute_kalshi_order, kalshi_params)
-        poly_future = executor.submit(execute_polymarket_order, polymarket_params)
-        
-        kalshi_order = kalshi_future.result()
-        polymarket_order = poly_future.result()
-        
-    return kalshi_order, polymarket_order
+    """
+    Executes orders on both Kalshi and Polymarket at once through the shared execution engine,
+    which enforces per-leg deadlines and unwinds a lone filled leg.
+
+    Returns:
+        dict: The engine's trade report; 'kalshi' and 'polymarket' leg reports (each with the venue
+              'response' and its 'state'), any 'hedge' / 'unwind' report, and the trade's 'outcome'
+    """
+    from executionEngine import get_execution_engine
+    return get_execution_engine().execute(kalshi_params, polymarket_params)
 
 def kalshi_auth() -> str:
-    url = "https://trading-api.kalshi.com/trade-api/v2/login"
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "User-Agent": "curl/8.4.0"
-    }
-    payload = {
-        "email": os.getenv("KALSHI_EMAIL"),
-        "password": os.getenv("KALSHI_PASSWORD")
-    }
-    
-    
-    response = requests.post(
-        url, 
-        json=payload,
-        headers=headers,
-        proxies={'http': None, 'https': None},  # Explicitly bypass proxy
-        verify=True
-    )
-    
-    return response.json()["token"]
+    """Current Kalshi token from the shared token manager (cached on disk, refreshed in the background)"""
+    return get_kalshi_token_manager().token
 
 def get_polymarket_client():
+    from py_clob_client.clob_types import ApiCreds
+    from py_clob_client.client import ClobClient
+    from py_clob_client.constants import POLYGON
+
     host = os.getenv("POLYMARKET_HOST")
     key = os.getenv("POLYMARKET_KEY")
     funder = os.getenv("POLYMARKET_FUNDER")
@@ -0,0 +1,270 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import metrics
+from getArbPreview import calculate_arbitrage, chunked, get_kalshi_asks, get_polymarket_asks, get_polymarket_token_map
+
+
+def pair_key(pair):
+    return (pair['kalshi_id'], pair['poly_id'])
+
+
+class PriceEngine:
+    """
+    In-memory top-of-book table for every verified pair.
+
+    Updates are plain dicts, either
+        {'venue': 'kalshi', 'ticker': ..., 'yes_ask': ..., 'no_ask': ...}
+        {'venue': 'polymarket', 'token_id': ..., 'ask': ...}
+    and every change re-runs calculate_arbitrage for just the pairs that reference that book.
+    """
+
+    def __init__(self, pairs, stake=10, on_opportunity=None):
+        """
+        Args:
+            pairs (list): Dicts with kalshi_id, poly_id, polymarket_yes_token, polymarket_no_token
+            stake (float): Stake passed to calculate_arbitrage
+            on_opportunity (callable): Called as on_opportunity(pair, arb, prices) when a pair has arbitrage
+        """
+        self.stake = stake
+        self.on_opportunity = on_opportunity
+        self.pairs = {pair_key(pair): pair for pair in pairs}
+        self.kalshi_books = {}
+        self.polymarket_books = {}
+        self.opportunities = {}
+        self.updates_applied = 0
+
+        self._pairs_by_ticker = defaultdict(list)
+        self._pairs_by_token = defaultdict(list)
+        for key, pair in self.pairs.items():
+            self._pairs_by_ticker[pair['kalshi_id']].append(key)
+            self._pairs_by_token[pair['polymarket_yes_token']].append(key)
+            self._pairs_by_token[pair['polymarket_no_token']].append(key)
+        self._lock = threading.Lock()
+
+    def apply_update(self, update):
+        """Apply one book update; returns the pair keys that were re-evaluated"""
+        with self._lock:
+            if update['venue'] == 'kalshi':
+                book = {'yes_ask': float(update['yes_ask']), 'no_ask': float(update['no_ask'])}
+                if self.kalshi_books.get(update['ticker'], {}).get('book') == book:
+                    return []
+                self.kalshi_books[update['ticker']] = {'book': book, 'ts': update.get('ts', time.time())}
+                affected = self._pairs_by_ticker.get(update['ticker'], [])
+            elif update['venue'] == 'polymarket':
+                ask = float(update['ask'])
+                if self.polymarket_books.get(update['token_id'], {}).get('ask') == ask:
+                    return []
+                self.polymarket_books[update['token_id']] = {'ask': ask, 'ts': update.get('ts', time.time())}
+                affected = self._pairs_by_token.get(update['token_id'], [])
+            else:
+                logging.warning(f"Ignoring update for unknown venue: {update}")
+                return []
+            self.updates_applied += 1
+
+            # One timing per update rather than per pair keeps the instrumentation off the per-pair path
+            evaluate_started = time.perf_counter()
+            results = [(key, self._evaluate(key)) for key in affected]
+            if results:
+                metrics.observe('arbitrage_evaluation_seconds', time.perf_counter() - evaluate_started)
+
+        for key, result in results:
+            if result is None:
+                continue
+            metrics.inc('opportunities_total')
+            if 'ts' in update:
+                # Book timestamp to detection: feed lag plus evaluation
+                metrics.observe('update_to_opportunity_seconds', time.time() - update['ts'], venue=update['venue'])
+            if self.on_opportunity is not None:
+                self.on_opportunity(self.pairs[key], *result)
+        return [key for key, _ in results]
+
+    def prices(self, key):
+        """Current top-of-book for a pair in the same shape arbReviewCli uses, or None if incomplete"""
+        pair = self.pairs[key]
+        kalshi = self.kalshi_books.get(pair['kalshi_id'])
+        poly_yes = self.polymarket_books.get(pair['polymarket_yes_token'])
+        poly_no = self.polymarket_books.get(pair['polymarket_no_token'])
+        if kalshi is None or poly_yes is None or poly_no is None:
+            return None
+        return {
+            'kalshi_yes_ask': kalshi['book']['yes_ask'],
+            'kalshi_no_ask': kalshi['book']['no_ask'],
+            'polymarket_yes_ask': poly_yes['ask'],
+            'polymarket_no_ask': poly_no['ask'],
+            'polymarket_yes_token': pair['polymarket_yes_token'],
+            'polymarket_no_token': pair['polymarket_no_token'],
+        }
+
+    def _evaluate(self, key):
+        prices = self.prices(key)
+        if prices is None or min(prices['kalshi_yes_ask'], prices['kalshi_no_ask'],
+                                 prices['polymarket_yes_ask'], prices['polymarket_no_ask']) <= 0:
+            self.opportunities.pop(key, None)
+            return None
+
+        arb = calculate_arbitrage(
+            prices['kalshi_yes_ask'], prices['kalshi_no_ask'],
+            prices['polymarket_yes_ask'], prices['polymarket_no_ask'], self.stake
+        )
+        if arb == 'No Arbitrage':
+            self.opportunities.pop(key, None)
+            return None
+        self.opportunities[key] = {'arb': arb, 'prices': prices}
+        return arb, prices
+
+    def run(self, feed):
+        """Consume a feed (any iterable of updates) until it is exhausted"""
+        for update in feed:
+            self.apply_update(update)
+
+
+class ReplayFeed:
+    """Replays book updates recorded as JSON lines, optionally paced by their 'ts' field"""
+
+    def __init__(self, path, speed=None):
+        self.path = path
+        self.speed = speed
+
+    def __iter__(self):
+        previous_ts = None
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                update = json.loads(line)
+                if self.speed and previous_ts is not None and 'ts' in update:
+                    time.sleep(max(0.0, (update['ts'] - previous_ts) / self.speed))
+                previous_ts = update.get('ts', previous_ts)
+                yield update
+
+
+class PollingFeed:
+    """Tightly polls both venues' bulk price endpoints for the given pairs and yields updates"""
+
+    def __init__(self, kalshi_auth_token, polymarket_client, pairs, interval=1.0):
+        """kalshi_auth_token may be None to use the shared, auto-refreshing token"""
+        self.kalshi_auth_token = kalshi_auth_token
+        self.polymarket_client = polymarket_client
+        self.tickers = sorted({pair['kalshi_id'] for pair in pairs})
+        self.tokens = sorted({pair[side] for pair in pairs for side in ('polymarket_yes_token', 'polymarket_no_token')})
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def _poll_kalshi(self):
+        for chunk in chunked(self.tickers, 100):
+            try:
+                asks = get_kalshi_asks(self.kalshi_auth_token, chunk)
+            except Exception as e:
+                logging.error(f"Kalshi poll failed: {e}")
+                continue
+            now = time.time()
+            for ticker, (yes_ask, no_ask) in asks.items():
+                yield {'venue': 'kalshi', 'ticker': ticker, 'yes_ask': yes_ask, 'no_ask': no_ask, 'ts': now}
+
+    def _poll_polymarket(self):
+        for chunk in chunked(self.tokens, 100):
+            try:
+                asks = get_polymarket_asks(self.polymarket_client, chunk)
+            except Exception as e:
+                logging.error(f"Polymarket poll failed: {e}")
+                continue
+            now = time.time()
+            for token, ask in asks.items():
+                yield {'venue': 'polymarket', 'token_id': token, 'ask': ask, 'ts': now}
+
+    def poll_once(self):
+        """One sweep over every ticker and token"""
+        yield from self._poll_kalshi()
+        yield from self._poll_polymarket()
+
+    def __iter__(self):
+        while not self.stop_event.is_set():
+            started = time.time()
+            yield from self.poll_once()
+            self.stop_event.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def record_feed(feed, path):
+    """Pass updates through while appending them to a JSONL file for later replay"""
+    with open(path, 'a') as f:
+        for update in feed:
+            f.write(json.dumps(update) + "\n")
+            yield update
+
+
+def resolve_pairs(verified_pairs):
+    """Turn db verified rows into engine pairs by looking up their Polymarket CLOB tokens in bulk"""
+    polymarket_ids = list(dict.fromkeys(str(row['polymarket_id']) for row in verified_pairs))
+    token_map = {}
+    for chunk in chunked(polymarket_ids, 100):
+        try:
+            token_map.update(get_polymarket_token_map(chunk))
+        except Exception as e:
+            logging.error(f"Could not resolve Polymarket tokens: {e}")
+
+    pairs = []
+    for row in verified_pairs:
+        tokens = token_map.get(str(row['polymarket_id']))
+        if tokens is None:
+            logging.error(f"No CLOB tokens for {row['polymarket_id']}, skipping")
+            continue
+        pairs.append({
+            'kalshi_id': row['kalshi_ticker'],
+            'poly_id': row['polymarket_id'],
+            'kalshi_title': row.get('kalshi_title'),
+            'poly_question': row.get('poly_question'),
+            'polymarket_yes_token': tokens[0],
+            'polymarket_no_token': tokens[1],
+        })
+    return pairs
+
+
+def print_opportunity(pair, arb, prices):
+    print(f"{time.strftime('%H:%M:%S')} {pair['kalshi_id']} / {pair['poly_id']}: "
+          f"min ROI {arb['outcomes']['min_roi']:.2f}% "
+          f"(yes on {arb['market_allocation']['yes_market']}, no on {arb['market_allocation']['no_market']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream prices for verified pairs and report arbitrage")
+    parser.add_argument('--replay', help="JSONL file of recorded book updates to replay instead of polling")
+    parser.add_argument('--pairs', help="JSON file of resolved pairs (required with --replay)")
+    parser.add_argument('--record', help="Append every live update to this JSONL file")
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--stake', type=float, default=10)
+    args = parser.parse_args()
+    if args.replay and not args.pairs:
+        parser.error("--replay needs --pairs (a recording has no pair list of its own)")
+    logging.basicConfig(level=logging.INFO)
+
+    if args.replay:
+        with open(args.pairs) as f:
+            pairs = json.load(f)
+        feed = ReplayFeed(args.replay)
+    else:
+        from db import get_verified_pairs
+        from placeOrder import get_polymarket_client
+        pairs = resolve_pairs(get_verified_pairs())
+        feed = PollingFeed(None, get_polymarket_client(), pairs, args.interval)
+        if args.record:
+            feed = record_feed(feed, args.record)
+
+    engine = PriceEngine(pairs, args.stake, on_opportunity=print_opportunity)
+    logging.info(f"Streaming {len(pairs)} pairs")
+    try:
+        engine.run(feed)
+    except KeyboardInterrupt:
+        pass
+    logging.info(f"Applied {engine.updates_applied} book updates, {len(engine.opportunities)} live opportunities")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from getArbPreview import get_current_prices_batch, calculate_arbitrage_table, arbitrage_row_to_dict
+from db import get_market_verification
+
+PRICE_COLUMNS = ['kalshi_yes_ask', 'kalshi_no_ask', 'polymarket_yes_ask', 'polymarket_no_ask',
+                 'polymarket_yes_token', 'polymarket_no_token']
+
+
+class ReviewPipeline:
+    """
+    Background producer that keeps the review queue stocked with priced opportunities.
+
+    The producer walks the matched pairs a window at a time, looks up verification status
+    for the window concurrently, drops pairs already marked different, prices the rest with
+    one batched fetch and drops those without arbitrage. Survivors wait in a priority queue,
+    best min ROI first, so the operator only ever sees actionable pairs and never waits on
+    the network between decisions.
+    """
+
+    def __init__(self, rows, polymarket_client, lookahead=50, max_workers=8, stake=10, verification_cache=None):
+        """
+        Args:
+            rows (pd.DataFrame): Matched pairs with kalshi_id, poly_id, kalshi_title, poly_question
+            polymarket_client: CLOB client used for batched prices
+            lookahead (int): Pairs prefetched per window, and the most opportunities held at once
+            max_workers (int): Concurrent verification lookups
+            stake (float): Stake passed to the arbitrage calculation
+            verification_cache (VerificationCache): Answers status lookups from memory instead of Supabase
+        """
+        self.rows = rows
+        self.polymarket_client = polymarket_client
+        self.lookahead = lookahead
+        self.max_workers = max_workers
+        self.stake = stake
+        self.verification_cache = verification_cache
+
+        self.queue = queue.PriorityQueue(maxsize=lookahead)
+        self.stop_event = threading.Event()
+        self.done = threading.Event()
+        self.stats = {'scanned': 0, 'different': 0, 'no_arbitrage': 0, 'queued': 0}
+        self._sequence = itertools.count()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._produce, name='review-producer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _verification_statuses(self, window):
+        keys = list(zip(window['kalshi_id'], window['poly_id']))
+        if self.verification_cache is not None:
+            return [self.verification_cache.get(*key) for key in keys]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda key: get_market_verification(*key), keys))
+
+    def _price_window(self, window):
+        """Priced, arbitrage-checked rows of the window as a DataFrame"""
+        prices = get_current_prices_batch(None, self.polymarket_client, list(zip(window['kalshi_id'], window['poly_id'])))
+        prices.index = window.index
+        # Same guard the CLI used: any missing quote means no trade
+        quoted = (prices[['kalshi_yes_ask', 'kalshi_no_ask', 'polymarket_yes_ask', 'polymarket_no_ask']] > 0).all(axis=1)
+        table = calculate_arbitrage_table(prices[quoted], self.stake)
+        return window.loc[table.index].join(table[[c for c in table.columns if c not in window.columns]])
+
+    def _put(self, item):
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put((-item['arb_opportunity']['outcomes']['min_roi'], next(self._sequence), item), timeout=0.5)
+                self.stats['queued'] += 1
+                return
+            except queue.Full:
+                continue
+
+    def _produce(self):
+        try:
+            for start in range(0, len(self.rows), self.lookahead):
+                if self.stop_event.is_set():
+                    break
+                window = self.rows.iloc[start:start + self.lookahead]
+                self.stats['scanned'] += len(window)
+
+                statuses = self._verification_statuses(window)
+                keep = [status is not False for status in statuses]
+                self.stats['different'] += keep.count(False)
+                window = window.assign(verification=statuses)[keep]
+                if window.empty:
+                    continue
+
+                try:
+                    priced = self._price_window(window)
+                except Exception as e:
+                    logging.error(f"Prefetching prices failed for rows {start}-{start + len(window)}: {e}")
+                    continue
+                fetched_at = time.time()
+                priced = priced[priced['has_arbitrage']]
+                self.stats['no_arbitrage'] += len(window) - len(priced)
+
+                for _, row in priced.iterrows():
+                    self._put({
+                        'row': row[[c for c in self.rows.columns]],
+                        'verification': row['verification'],
+                        'prices': row[PRICE_COLUMNS].to_dict(),
+                        'arb_opportunity': arbitrage_row_to_dict(row),
+                        'fetched_at': fetched_at,
+                    })
+        finally:
+            self.done.set()
+
+    def __iter__(self):
+        """Yield queued opportunities, best first, until the producer has finished and the queue is drained"""
+        while not self.stop_event.is_set():
+            try:
+                _, _, item = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                if self.done.is_set() and self.queue.empty():
+                    return
+                continue
+            yield item
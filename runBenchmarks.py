@@ -0,0 +1,335 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from annIndex import IVFIndex
+from orderBookSizing import size_arbitrage
+from snapshots import load_snapshot, save_snapshot
+from similarity import cosine_similarity_matrix, greedy_assignment, top_k_candidates
+
+
+def _synthetic_bucket(n, dim=512, seed=0):
+    """Random poly/kalshi frames plus embeddings where roughly a third of the rows have a near-duplicate"""
+    rng = np.random.default_rng(seed)
+    poly_embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+    kalshi_embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+    twins = rng.choice(n, size=n // 3, replace=False)
+    kalshi_embeddings[twins] = poly_embeddings[twins] + 0.3 * rng.standard_normal((len(twins), dim)).astype(np.float32)
+    poly_df = pd.DataFrame({'id': [str(i) for i in range(n)], 'question': [f"question {i}" for i in range(n)]})
+    kalshi_df = pd.DataFrame({'ticker': [f"KX-{i}" for i in range(n)], 'full_title': [f"title {i}" for i in range(n)]})
+    return poly_df, kalshi_df, poly_embeddings, kalshi_embeddings
+
+
+def _legacy_extract(similarity_matrix, poly_df, kalshi_df, max_rows=None):
+    """The original nested iterrows walk, optionally stopped after max_rows Polymarket rows"""
+    kalshi_ids, polymarket_ids = set(), set()
+    similar_pairs = []
+    for i, _ in poly_df.iterrows():
+        if max_rows is not None and i >= max_rows:
+            break
+        for j, _ in kalshi_df.iterrows():
+            similarity_score = similarity_matrix[i][j]
+            if poly_df.iloc[i]['id'] not in polymarket_ids and kalshi_df.iloc[j]['ticker'] not in kalshi_ids:
+                kalshi_ids.add(kalshi_df.iloc[j]['ticker'])
+                polymarket_ids.add(poly_df.iloc[i]['id'])
+                if similarity_score > 0.7:
+                    similar_pairs.append((i, j, float(similarity_score)))
+    return similar_pairs
+
+
+def bench_matcher(sizes, legacy_budget_rows=20):
+    """Time similarity extraction for buckets of each size, legacy loop extrapolated from a row sample"""
+    for n in sizes:
+        poly_df, kalshi_df, poly_embeddings, kalshi_embeddings = _synthetic_bucket(n)
+        sim = cosine_similarity_matrix(poly_embeddings, kalshi_embeddings)
+
+        start = time.perf_counter()
+        rows, _, _ = greedy_assignment(sim, 0.7)
+        greedy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        top_rows, _, _ = top_k_candidates(sim, 5, 0.7)
+        top_k_time = time.perf_counter() - start
+
+        sample = min(n, legacy_budget_rows)
+        start = time.perf_counter()
+        _legacy_extract(sim, poly_df, kalshi_df, max_rows=sample)
+        legacy_time = (time.perf_counter() - start) * n / sample
+
+        print(f"n={n:>6}  legacy~{legacy_time:10.3f}s  greedy={greedy_time:8.4f}s ({len(rows)} pairs)  "
+              f"top5={top_k_time:8.4f}s ({len(top_rows)} candidates)  speedup~{legacy_time / max(greedy_time, 1e-9):,.0f}x")
+
+
+def _clustered_embeddings(n, n_clusters, dim=512, seed=0):
+    """Sentence embeddings cluster by topic, so sample around random topic centres"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(n_clusters, size=n)
+    return centres[labels] + 1.2 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def bench_ann(n_kalshi, n_poly, k=5, n_probe=8):
+    """Recall@k and latency of the IVF index against the exact brute-force cosine matrix"""
+    data = _clustered_embeddings(n_kalshi + n_poly, n_clusters=max(10, n_kalshi // 50))
+    kalshi_embeddings, poly_embeddings = data[:n_kalshi], data[n_kalshi:]
+
+    start = time.perf_counter()
+    exact = top_k_candidates(cosine_similarity_matrix(poly_embeddings, kalshi_embeddings), k, threshold=-np.inf)[1]
+    exact_time = time.perf_counter() - start
+    exact = exact.reshape(n_poly, k)
+
+    start = time.perf_counter()
+    index = IVFIndex(n_probe=n_probe)
+    index.add(range(n_kalshi), kalshi_embeddings)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    approx, _ = index.search(poly_embeddings, k)
+    search_time = time.perf_counter() - start
+
+    hits = sum(len(set(exact[i]) & set(approx[i])) for i in range(n_poly))
+    recall = hits / (n_poly * k)
+
+    start = time.perf_counter()
+    index.remove(range(0, n_kalshi, 10))
+    index.add(range(0, n_kalshi, 10), kalshi_embeddings[::10])
+    churn_time = time.perf_counter() - start
+
+    print(f"kalshi={n_kalshi} poly={n_poly} k={k} n_probe={n_probe}  recall@{k}={recall:.3f}  "
+          f"exact={exact_time:.3f}s  ivf build={build_time:.3f}s search={search_time:.3f}s  "
+          f"10% delete+insert={churn_time:.3f}s")
+
+
+def _synthetic_polymarket_catalog(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': [str(i) for i in range(n)],
+        'question': [f"Will event {i} happen before the deadline?" for i in range(n)],
+        'slug': [f"will-event-{i}-happen" for i in range(n)],
+        'description': ["Long resolution criteria text " * 10] * n,
+        'liquidity': rng.random(n) * 1e5,
+        'volume': rng.random(n) * 1e6,
+        'best_bid': rng.random(n),
+        'best_ask': rng.random(n),
+        'outcomes': [["Yes", "No"]] * n,
+        'outcome_prices': [[float(p), float(1 - p)] for p in rng.random(n)],
+        'clob_token_ids': [[str(rng.integers(1 << 62)), str(rng.integers(1 << 62))] for _ in range(n)],
+    })
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def bench_snapshot(n, columns=('id', 'question', 'best_ask')):
+    """CSV vs Arrow IPC snapshot: write time, full load, projected load and peak Python memory"""
+    df = _synthetic_polymarket_catalog(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'markets.csv')
+        arrow_path = os.path.join(tmp, 'markets.arrow')
+
+        _, csv_write, _ = _measure(lambda: df.to_csv(csv_path, index=False))
+        _, arrow_write, _ = _measure(lambda: save_snapshot(df, arrow_path))
+        _, csv_load, csv_mem = _measure(lambda: pd.read_csv(csv_path))
+        _, arrow_load, arrow_mem = _measure(lambda: load_snapshot(arrow_path))
+        _, csv_proj, csv_proj_mem = _measure(lambda: pd.read_csv(csv_path, usecols=list(columns)))
+        loaded, arrow_proj, arrow_proj_mem = _measure(lambda: load_snapshot(arrow_path, columns=list(columns)))
+
+        print(f"rows={n}  csv {os.path.getsize(csv_path) / 1e6:.1f}MB  arrow {os.path.getsize(arrow_path) / 1e6:.1f}MB")
+        print(f"  write      csv={csv_write:.3f}s  arrow={arrow_write:.3f}s")
+        print(f"  full load  csv={csv_load:.3f}s ({csv_mem:.0f}MB peak)  arrow={arrow_load:.3f}s ({arrow_mem:.0f}MB peak)")
+        print(f"  {len(columns)} columns  csv={csv_proj:.3f}s ({csv_proj_mem:.0f}MB peak)  arrow={arrow_proj:.3f}s ({arrow_proj_mem:.0f}MB peak)")
+        print(f"  nested clob_token_ids survive: {type(load_snapshot(arrow_path, ['clob_token_ids'])['clob_token_ids'][0]).__name__}"
+              f" vs csv {type(pd.read_csv(csv_path, usecols=['clob_token_ids'])['clob_token_ids'][0]).__name__}")
+
+
+def bench_arbitrage(n, stake=10):
+    """Scalar calculate_arbitrage loop vs one calculate_arbitrage_vectorized pass over n pairs"""
+    from getArbPreview import calculate_arbitrage, calculate_arbitrage_vectorized
+
+    rng = np.random.default_rng(0)
+    kalshi_yes = np.round(rng.uniform(0.01, 0.99, n), 2)
+    kalshi_no = np.round(rng.uniform(0.01, 0.99, n), 2)
+    poly_yes = np.round(rng.uniform(0.001, 0.999, n), 3)
+    poly_no = np.round(rng.uniform(0.001, 0.999, n), 3)
+
+    start = time.perf_counter()
+    scalar = [
+        calculate_arbitrage(float(a), float(b), float(c), float(d), stake)
+        for a, b, c, d in zip(kalshi_yes, kalshi_no, poly_yes, poly_no)
+    ]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = calculate_arbitrage_vectorized(kalshi_yes, kalshi_no, poly_yes, poly_no, stake)
+    vector_time = time.perf_counter() - start
+
+    agree = sum((s != 'No Arbitrage') == bool(v) for s, v in zip(scalar, table['has_arbitrage']))
+    print(f"pairs={n}  scalar={scalar_time:.3f}s  vectorized={vector_time:.4f}s  "
+          f"speedup={scalar_time / max(vector_time, 1e-9):,.0f}x  verdicts agree on {agree}/{n}")
+
+
+def _synthetic_ladder(rng, best, levels):
+    prices = np.round(best + np.cumsum(rng.integers(0, 2, levels)) * 0.001, 3)
+    sizes = rng.integers(1, 500, levels).astype(float)
+    return list(zip(prices.tolist(), sizes.tolist()))
+
+
+def bench_depth(levels, repeats=200):
+    """Latency of depth-aware sizing on synthetic books with the given number of levels per side"""
+    rng = np.random.default_rng(0)
+    books = (
+        _synthetic_ladder(rng, 0.40, levels), _synthetic_ladder(rng, 0.62, levels),
+        _synthetic_ladder(rng, 0.45, levels), _synthetic_ladder(rng, 0.52, levels),
+    )
+    size_arbitrage(*books)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        plan = size_arbitrage(*books)
+    per_call = (time.perf_counter() - start) / repeats
+
+    contracts = plan['optimal_allocation']['kalshi_contracts'] if plan != 'No Arbitrage' else 0
+    print(f"levels={levels}  {per_call * 1e3:.3f} ms per sizing  ({contracts} contracts in plan)")
+
+
+def bench_encoder(backends, n):
+    """Cold start (build + first call) and throughput of each embedding backend on market-like titles"""
+    from encoders import time_encoder
+
+    texts = [f"Will candidate {i % 97} win the {2024 + i % 4} race in district {i}?" for i in range(n)]
+    for backend in backends:
+        name, _, variant = backend.partition(':')
+        kwargs = {}
+        if variant:
+            kwargs['backend'] = 'onnx' if 'onnx' in variant else 'torch'
+            kwargs['quantize'] = 'int8' in variant
+        try:
+            cold_start, throughput = time_encoder(name, texts, **kwargs)
+        except Exception as e:
+            print(f"{backend:<32} unavailable: {e}")
+            continue
+        print(f"{backend:<32} cold start={cold_start:7.2f}s  throughput={throughput:9.0f} texts/s")
+
+
+# Heavy or network-bound packages that must not load just to show the first menu
+STARTUP_FORBIDDEN = ('py_clob_client', 'supabase', 'curl_cffi', 'tensorflow', 'tensorflow_hub', 'torch',
+                     'sentence_transformers', 'openai')
+
+
+def _import_profile(module):
+    """
+    Profile `import module` in a fresh interpreter with -X importtime.
+
+    Returns:
+        tuple: (total ms, {direct dependency: cumulative ms}, set of top-level packages loaded, error or None)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            capture_output=True, text=True)
+    total = 0.0
+    children = {}
+    dependencies = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, total_us, name = line[len('import time:'):].split('|')
+        # Each nesting level indents the name by two more spaces; children are listed before their parent
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        loaded.add(name.split('.')[0])
+        if depth == 1:
+            children[name] = int(total_us) / 1000
+        elif depth == 0:
+            if name == module:
+                total, dependencies = int(total_us) / 1000, children
+            children = {}
+    error = result.stderr.strip().splitlines()[-1] if result.returncode else None
+    return total, dependencies, loaded, error
+
+
+def bench_startup(modules, budget_ms):
+    """Import cost of each entry point; returns False if any exceeds the budget or loads a forbidden package"""
+    ok = True
+    for module in modules:
+        total, dependencies, loaded, error = _import_profile(module)
+        if error:
+            print(f"{module}: import failed: {error}")
+            ok = False
+            continue
+        heavy = sorted(set(STARTUP_FORBIDDEN) & loaded)
+        within = total <= budget_ms and not heavy
+        ok &= within
+        print(f"{module:<16} {total:8.1f} ms (budget {budget_ms:.0f} ms)  {'ok' if within else 'FAIL'}")
+        if heavy:
+            print(f"  loads at import: {', '.join(heavy)}")
+        slowest = sorted(((ms, name) for name, ms in dependencies.items()), reverse=True)[:5]
+        for ms, name in slowest:
+            print(f"  {name:<24} {ms:8.1f} ms")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the arbitrage pipeline")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    matcher_parser = subparsers.add_parser('matcher', help="similarity pair extraction")
+    matcher_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+
+    ann_parser = subparsers.add_parser('ann', help="IVF index recall and latency vs brute force")
+    ann_parser.add_argument('--kalshi', type=int, default=20000)
+    ann_parser.add_argument('--poly', type=int, default=5000)
+    ann_parser.add_argument('--k', type=int, default=5)
+    ann_parser.add_argument('--n-probe', type=int, default=8)
+
+    snapshot_parser = subparsers.add_parser('snapshot', help="CSV vs Arrow snapshot load time and memory")
+    snapshot_parser.add_argument('--rows', type=int, default=200000)
+
+    arbitrage_parser = subparsers.add_parser('arbitrage', help="scalar vs vectorized calculate_arbitrage")
+    arbitrage_parser.add_argument('--pairs', type=int, default=100000)
+
+    depth_parser = subparsers.add_parser('depth', help="depth-aware sizing on deep synthetic books")
+    depth_parser.add_argument('--levels', type=int, nargs='+', default=[10, 100, 1000, 10000])
+
+    encoder_parser = subparsers.add_parser('encoder', help="embedding backend cold start and throughput")
+    encoder_parser.add_argument('--backends', nargs='+', default=['use', 'st', 'st:int8', 'st:onnx', 'st:onnx-int8'],
+                                help="use, st, or st:<torch|int8|onnx|onnx-int8>")
+    encoder_parser.add_argument('--texts', type=int, default=5000)
+
+    startup_parser = subparsers.add_parser('startup', help="import time of the CLI entry points; exits 1 over budget")
+    startup_parser.add_argument('--modules', nargs='+', default=['arbReviewCli', 'analyzeMarkets'])
+    startup_parser.add_argument('--budget-ms', type=float, default=1500)
+
+    args = parser.parse_args()
+    if args.benchmark == 'matcher':
+        bench_matcher(args.sizes)
+    elif args.benchmark == 'ann':
+        bench_ann(args.kalshi, args.poly, args.k, args.n_probe)
+    elif args.benchmark == 'snapshot':
+        bench_snapshot(args.rows)
+    elif args.benchmark == 'arbitrage':
+        bench_arbitrage(args.pairs)
+    elif args.benchmark == 'depth':
+        for levels in args.levels:
+            bench_depth(levels)
+    elif args.benchmark == 'encoder':
+        bench_encoder(args.backends, args.texts)
+    elif args.benchmark == 'startup':
+        if not bench_startup(args.modules, args.budget_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
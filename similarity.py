@@ -0,0 +1,141 @@
+import numpy as np
+
+SIMILARITY_THRESHOLD = 0.7
+
+
+def cosine_similarity_matrix(a, b):
+    """Row-normalize both embedding matrices and return the (len(a), len(b)) cosine matrix"""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    a_norm = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b_norm = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return a_norm @ b_norm.T
+
+
+def greedy_assignment(similarity_matrix, threshold=SIMILARITY_THRESHOLD, row_mask=None, col_mask=None):
+    """
+    One-to-one assignment of rows to columns, best score first.
+
+    Args:
+        similarity_matrix (np.ndarray): (rows, cols) similarity scores
+        threshold (float): Only pairs scoring strictly above this are considered
+        row_mask (np.ndarray): Optional boolean array, False rows are never assigned
+        col_mask (np.ndarray): Optional boolean array, False columns are never assigned
+
+    Returns:
+        tuple: (row_indices, col_indices, scores) as NumPy arrays
+    """
+    sim = np.asarray(similarity_matrix)
+    candidates = sim > threshold
+    if row_mask is not None:
+        candidates &= np.asarray(row_mask, dtype=bool)[:, None]
+    if col_mask is not None:
+        candidates &= np.asarray(col_mask, dtype=bool)[None, :]
+
+    rows, cols = np.nonzero(candidates)
+    return greedy_pairs(rows, cols, sim[rows, cols], sim.shape[0], sim.shape[1])
+
+
+def greedy_pairs(rows, cols, scores, n_rows, n_cols):
+    """One-to-one selection over sparse (row, col, score) candidates, best score first"""
+    rows, cols, scores = np.asarray(rows), np.asarray(cols), np.asarray(scores)
+    order = np.argsort(-scores, kind='stable')
+    rows, cols, scores = rows[order], cols[order], scores[order]
+
+    # Only the (usually tiny) set of above-threshold candidates is walked in Python
+    row_taken = np.zeros(n_rows, dtype=bool)
+    col_taken = np.zeros(n_cols, dtype=bool)
+    keep = np.zeros(len(rows), dtype=bool)
+    for n, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+        if row_taken[i] or col_taken[j]:
+            continue
+        row_taken[i] = True
+        col_taken[j] = True
+        keep[n] = True
+    return rows[keep], cols[keep], scores[keep]
+
+
+def top_k_candidates(similarity_matrix, k, threshold=SIMILARITY_THRESHOLD, row_mask=None, col_mask=None):
+    """
+    Per-row top-k columns scoring above threshold, without enforcing one-to-one.
+
+    Returns:
+        tuple: (row_indices, col_indices, scores) ordered by row, then descending score
+    """
+    sim = np.array(similarity_matrix, dtype=np.float32, copy=True)
+    n_rows, n_cols = sim.shape
+    if n_rows == 0 or n_cols == 0:
+        empty = np.array([], dtype=np.intp)
+        return empty, empty, np.array([], dtype=np.float32)
+    if row_mask is not None:
+        sim[~np.asarray(row_mask, dtype=bool), :] = -np.inf
+    if col_mask is not None:
+        sim[:, ~np.asarray(col_mask, dtype=bool)] = -np.inf
+
+    k = min(k, n_cols)
+    top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(sim, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    rows = np.repeat(np.arange(n_rows), k)
+    cols = top.ravel()
+    scores = top_scores.ravel()
+    keep = scores > threshold
+    return rows[keep], cols[keep], scores[keep]
+
+
+def mask_known_pairs(similarity_matrix, row_ids, col_ids, blocked_by_row):
+    """
+    Set the score of every labelled non-match to -inf, in place, so no threshold admits it.
+
+    Args:
+        row_ids, col_ids (array-like): Ids of the matrix rows and columns
+        blocked_by_row (dict): row id -> set of column ids that must never pair with it
+    """
+    if not blocked_by_row:
+        return similarity_matrix
+    col_positions = {col_id: j for j, col_id in enumerate(col_ids)}
+    for i, row_id in enumerate(row_ids):
+        blocked = blocked_by_row.get(row_id)
+        if blocked:
+            cols = [col_positions[col_id] for col_id in blocked if col_id in col_positions]
+            similarity_matrix[i, cols] = -np.inf
+    return similarity_matrix
+
+
+MIN_CALIBRATION_LABELS = 20
+
+
+def calibrate_threshold(scores, labels, default=SIMILARITY_THRESHOLD, min_labels=MIN_CALIBRATION_LABELS):
+    """
+    Similarity threshold that maximises F1 over labelled pairs.
+
+    Args:
+        scores (array-like): Similarity of each labelled pair
+        labels (array-like): True for a confirmed match, False for a confirmed non-match
+        default (float): Returned when there are fewer than min_labels of either class
+
+    Returns:
+        float: Threshold t such that pairs scoring strictly above t are accepted
+    """
+    scores = np.asarray(scores, dtype=float)
+    labels = np.asarray(labels, dtype=bool)
+    finite = np.isfinite(scores)
+    scores, labels = scores[finite], labels[finite]
+    positives = int(labels.sum())
+    if positives < min_labels or len(labels) - positives < min_labels:
+        return default
+
+    order = np.argsort(-scores, kind='stable')
+    scores, labels = scores[order], labels[order]
+    true_positives = np.cumsum(labels)
+    accepted = np.arange(1, len(scores) + 1)
+    # Only cut between distinct scores, since "> t" cannot separate ties
+    cut = np.append(scores[1:] < scores[:-1], True)
+    f1 = np.where(cut, 2 * true_positives / (accepted + positives), -1)
+    best = int(np.argmax(f1))
+    if best + 1 < len(scores):
+        return float((scores[best] + scores[best + 1]) / 2)
+    return float(np.nextafter(scores[best], -np.inf))
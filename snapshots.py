@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _to_table(df):
+    """
+    Convert a DataFrame to an Arrow table, keeping lists/dicts as nested Arrow types.
+
+    Columns Arrow cannot type (e.g. mixed dict shapes in raw Kalshi payloads) are stored
+    as JSON strings instead of failing the whole snapshot.
+    """
+    df = df.reset_index(drop=True)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        pass
+
+    columns = {}
+    for column in df.columns:
+        try:
+            columns[column] = pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            logging.warning(f"Snapshot column {column!r} stored as JSON text")
+            columns[column] = pa.array(
+                [None if value is None else json.dumps(value, default=_json_default) for value in df[column]],
+                type=pa.string(),
+            )
+    return pa.table(columns)
+
+
+def save_snapshot(df, path):
+    """Write df as an uncompressed Arrow IPC file so it can be memory-mapped on load"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = _to_table(df)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return len(df)
+
+
+def load_snapshot_table(path, columns=None):
+    """Memory-map a snapshot and return the Arrow table (zero-copy), optionally projected"""
+    source = pa.memory_map(str(path), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select([column for column in columns if column in table.column_names])
+    return table
+
+
+def load_snapshot(path, columns=None):
+    """Load a snapshot (or just the requested columns) as a pandas DataFrame"""
+    return load_snapshot_table(path, columns).to_pandas()
@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+import executionEngine
+from executionEngine import ExecutionEngine
+
+
+class MockKalshi:
+    """
+    Local Kalshi orders endpoint: market orders fill in full, optionally answering late, or
+    dropping the connection and only listing the order record_delay seconds later
+    """
+
+    def __init__(self, post_delay=0.0, fill=True, drop=False, record_delay=0.0):
+        self.post_delay = post_delay
+        self.fill = fill
+        self.drop = drop
+        self.record_delay = record_delay
+        self.orders = {}
+        self.posts = []
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                mock.posts.append(payload)
+                if payload['client_order_id'] in mock.orders:
+                    return self._reply(409, {'error': {'code': 'order_already_exists'}})
+                count = payload['count']
+                order = {'client_order_id': payload['client_order_id'], 'ticker': payload['ticker'],
+                         'action': payload['action'], 'status': 'executed' if mock.fill else 'canceled',
+                         'count': count, 'remaining_count': 0 if mock.fill else count,
+                         'fill_count': count if mock.fill else 0}
+                if mock.drop:
+                    # The order goes through, but the answer is lost and the order list lags behind
+                    threading.Timer(mock.record_delay, mock.orders.__setitem__, (payload['client_order_id'], order)).start()
+                    self.close_connection = True
+                    return
+                # The order is live on the exchange before the answer goes out
+                mock.orders[payload['client_order_id']] = order
+                time.sleep(mock.post_delay)
+                self._reply(201, {'order': order})
+
+            def do_GET(self):
+                ticker = parse_qs(urlparse(self.path).query).get('ticker', [None])[0]
+                self._reply(200, {'orders': [order for order in mock.orders.values() if order['ticker'] == ticker]})
+
+            def _reply(self, status, body):
+                body = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/trade-api/v2/portfolio/orders"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+class MockPolymarket:
+    """Stand-in for the CLOB order functions; `fills` is the post_order outcome per call"""
+
+    def __init__(self, fills, lookup=None):
+        self.fills = list(fills)
+        self.lookup = lookup
+        self.posted = []
+        self.signed = 0
+
+    def sign(self, params):
+        self.signed += 1
+        return f"signed-{self.signed}"
+
+    def post(self, params):
+        self.posted.append(params['signed_order'])
+        if self.fills.pop(0):
+            return {'success': True, 'status': 'matched', 'orderID': f"0x{len(self.posted)}", 'takingAmount': '10'}
+        return {'success': False, 'errorMsg': "order couldn't be fully filled, FOK orders are fully filled or killed"}
+
+    def state(self, params, response=None):
+        return self.lookup
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    engine = ExecutionEngine(leg_timeout=0.3, settle_timeout=2.0, retries=1)
+    yield engine
+    engine.close()
+
+
+def use_polymarket(monkeypatch, polymarket):
+    monkeypatch.setattr(executionEngine, 'sign_polymarket_order', polymarket.sign)
+    monkeypatch.setattr(executionEngine, 'execute_polymarket_order', polymarket.post)
+    monkeypatch.setattr(executionEngine, 'get_polymarket_order_state', polymarket.state)
+
+
+def kalshi_params(kalshi):
+    return {'ticker': 'KXTEST', 'count': 10, 'side': 'yes', 'auth_token': 'test', 'url': kalshi.url}
+
+
+def test_timeout_then_late_fill_is_not_retried_or_unwound(engine, monkeypatch):
+    kalshi = MockKalshi(post_delay=1.0)
+    polymarket = MockPolymarket(fills=[True])
+    use_polymarket(monkeypatch, polymarket)
+    try:
+        result = engine.execute(kalshi_params(kalshi), {'token_id': 'tok', 'amount': 10, 'price': 0.45})
+    finally:
+        kalshi.close()
+
+    assert result['kalshi']['filled'] and result['kalshi']['attempts'] == 1
+    assert result['outcome'] == 'both'
+    assert result['hedge'] is None and result['unwind'] is None
+    assert len(kalshi.posts) == 1
+    assert polymarket.posted == ['signed-1']
+
+
+def test_lost_answer_waits_for_order_to_appear_before_a_new_id(engine, monkeypatch):
+    kalshi = MockKalshi(drop=True, record_delay=0.8)
+    polymarket = MockPolymarket(fills=[True])
+    use_polymarket(monkeypatch, polymarket)
+    try:
+        result = engine.execute(kalshi_params(kalshi), {'token_id': 'tok', 'amount': 10, 'price': 0.45})
+    finally:
+        kalshi.close()
+
+    assert result['kalshi']['filled'] and result['kalshi']['attempts'] == 1
+    assert result['outcome'] == 'both'
+    assert len(kalshi.posts) == 1
+
+
+def test_hedge_reposts_original_signed_order(engine, monkeypatch):
+    kalshi = MockKalshi()
+    polymarket = MockPolymarket(fills=[False, False, True], lookup={'success': False, 'status': 'unmatched'})
+    use_polymarket(monkeypatch, polymarket)
+    try:
+        result = engine.execute(kalshi_params(kalshi), {'token_id': 'tok', 'amount': 10, 'price': 0.45})
+    finally:
+        kalshi.close()
+
+    assert result['outcome'] == 'hedged'
+    assert polymarket.signed == 1
+    assert polymarket.posted == ['signed-1'] * 3
+    assert [post['action'] for post in kalshi.posts] == ['buy']
+
+
+def test_unknown_leg_state_is_left_alone(engine, monkeypatch):
+    kalshi = MockKalshi()
+    polymarket = MockPolymarket(fills=[False], lookup=None)
+    use_polymarket(monkeypatch, polymarket)
+    try:
+        result = engine.execute(kalshi_params(kalshi), {'token_id': 'tok', 'amount': 10, 'price': 0.45})
+    finally:
+        kalshi.close()
+
+    assert result['polymarket']['state'] == 'unknown'
+    assert result['outcome'] == 'unknown'
+    assert result['hedge'] is None and result['unwind'] is None
+    assert [post['action'] for post in kalshi.posts] == ['buy']
+
+
+def test_failed_hedge_unwinds_with_fresh_id(engine, monkeypatch):
+    kalshi = MockKalshi()
+    polymarket = MockPolymarket(fills=[False, False, False, False], lookup={'success': False, 'status': 'unmatched'})
+    use_polymarket(monkeypatch, polymarket)
+    try:
+        result = engine.execute(kalshi_params(kalshi), {'token_id': 'tok', 'amount': 10, 'price': 0.45})
+    finally:
+        kalshi.close()
+
+    assert result['outcome'] == 'unwound'
+    assert [post['action'] for post in kalshi.posts] == ['buy', 'sell']
+    assert kalshi.posts[1]['client_order_id'] == f"{kalshi.posts[0]['client_order_id']}_unwind"
+
+
+def test_unbounded_polymarket_order_sends_nothing(engine, monkeypatch):
+    kalshi = MockKalshi()
+    polymarket = MockPolymarket(fills=[True])
+    use_polymarket(monkeypatch, polymarket)
+    try:
+        with pytest.raises(ValueError):
+            engine.execute(kalshi_params(kalshi), {'token_id': 'tok', 'amount': 10})
+    finally:
+        kalshi.close()
+
+    assert kalshi.posts == [] and polymarket.posted == []
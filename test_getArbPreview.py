@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from getArbPreview import calculate_arbitrage, calculate_arbitrage_vectorized, arbitrage_row_to_dict
+
+
+def price_grid(seed=7, size=4000):
+    """Random asks (on the cent grid and off it) and stakes (whole dollars and fractional)"""
+    rng = np.random.default_rng(seed)
+    cents = rng.integers(1, 100, size=(size // 2, 4)) / 100
+    floats = rng.uniform(0.01, 0.99, size=(size - size // 2, 4))
+    prices = np.vstack([cents, floats])
+    stakes = np.where(rng.random(size) < 0.5, rng.integers(1, 200, size), rng.uniform(1, 500, size))
+    return prices, stakes
+
+
+# Kalshi fees on a half-cent boundary where np.round and Python's round() disagree
+# (e.g. 250 contracts at 0.10 -> 1.575), with the Kalshi leg on either side
+TIE_CASES = [
+    (0.10, 0.99, 0.99, 0.01, 27.5),
+    (0.25, 0.99, 0.99, 0.01, 10.4),
+    (0.25, 0.99, 0.99, 0.01, 35.36),
+    (0.99, 0.10, 0.01, 0.99, 27.5),
+    (0.99, 0.25, 0.01, 0.99, 43.68),
+]
+
+
+def assert_same_result(scalar, vectorized):
+    if scalar == 'No Arbitrage':
+        assert vectorized == 'No Arbitrage'
+        return
+    assert vectorized != 'No Arbitrage'
+    assert vectorized['market_allocation'] == scalar['market_allocation']
+    assert vectorized['optimal_allocation']['kalshi_contracts'] == scalar['optimal_allocation']['kalshi_contracts']
+    for section in ('optimal_allocation', 'outcomes'):
+        for field, value in scalar[section].items():
+            assert vectorized[section][field] == pytest.approx(value, rel=1e-9, abs=1e-9), (section, field)
+
+
+def test_vectorized_matches_scalar_on_random_grid():
+    prices, stakes = price_grid()
+    result = calculate_arbitrage_vectorized(prices[:, 0], prices[:, 1], prices[:, 2], prices[:, 3], stakes)
+
+    arbitrages = 0
+    for (kalshi_buy, kalshi_sell, polymarket_buy, polymarket_sell), stake, (_, row) in zip(prices, stakes, result.iterrows()):
+        scalar = calculate_arbitrage(float(kalshi_buy), float(kalshi_sell), float(polymarket_buy), float(polymarket_sell), float(stake))
+        assert_same_result(scalar, arbitrage_row_to_dict(row))
+        arbitrages += scalar != 'No Arbitrage'
+    assert arbitrages > 100
+
+
+@pytest.mark.parametrize('stake', [5, 10, 25.5, 100])
+def test_vectorized_matches_scalar_with_scalar_stake(stake):
+    prices, _ = price_grid(seed=int(stake * 10), size=500)
+    result = calculate_arbitrage_vectorized(prices[:, 0], prices[:, 1], prices[:, 2], prices[:, 3], stake)
+    for (kalshi_buy, kalshi_sell, polymarket_buy, polymarket_sell), (_, row) in zip(prices, result.iterrows()):
+        scalar = calculate_arbitrage(float(kalshi_buy), float(kalshi_sell), float(polymarket_buy), float(polymarket_sell), stake)
+        assert_same_result(scalar, arbitrage_row_to_dict(row))
+
+
+def test_vectorized_matches_scalar_on_half_cent_fees():
+    prices = np.array(TIE_CASES)
+    result = calculate_arbitrage_vectorized(prices[:, 0], prices[:, 1], prices[:, 2], prices[:, 3], prices[:, 4])
+    for case, (_, row) in zip(TIE_CASES, result.iterrows()):
+        scalar = calculate_arbitrage(*case)
+        assert scalar != 'No Arbitrage'
+        contracts = scalar['optimal_allocation']['kalshi_contracts']
+        kalshi_price = min(case[0], case[1])
+        fee = 0.07 * contracts * kalshi_price * (1 - kalshi_price)
+        assert np.round(fee, 2) != round(fee, 2)
+        assert_same_result(scalar, arbitrage_row_to_dict(row))
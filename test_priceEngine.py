@@ -0,0 +1,54 @@
+import json
+
+from priceEngine import PriceEngine, ReplayFeed, pair_key
+
+PAIRS = [
+    {'kalshi_id': 'KXA', 'poly_id': '1', 'polymarket_yes_token': 'a-yes', 'polymarket_no_token': 'a-no'},
+    {'kalshi_id': 'KXB', 'poly_id': '2', 'polymarket_yes_token': 'b-yes', 'polymarket_no_token': 'b-no'},
+]
+
+
+def write_feed(path, updates):
+    with open(path, 'w') as f:
+        for update in updates:
+            f.write(json.dumps(update) + "\n")
+    return str(path)
+
+
+def book(ticker, yes_ask, no_ask, yes_token, yes_price, no_token, no_price):
+    return [
+        {'venue': 'kalshi', 'ticker': ticker, 'yes_ask': yes_ask, 'no_ask': no_ask},
+        {'venue': 'polymarket', 'token_id': yes_token, 'ask': yes_price},
+        {'venue': 'polymarket', 'token_id': no_token, 'ask': no_price},
+    ]
+
+
+def test_replay_reports_only_pairs_with_arbitrage(tmp_path):
+    updates = (book('KXA', 0.40, 0.62, 'a-yes', 0.60, 'a-no', 0.45)
+               + book('KXB', 0.50, 0.52, 'b-yes', 0.50, 'b-no', 0.52))
+    found = []
+    engine = PriceEngine(PAIRS, stake=100, on_opportunity=lambda pair, arb, prices: found.append(pair['kalshi_id']))
+    engine.run(ReplayFeed(write_feed(tmp_path / 'feed.jsonl', updates)))
+
+    assert engine.updates_applied == 6
+    assert found == ['KXA']
+    assert list(engine.opportunities) == [pair_key(PAIRS[0])]
+    assert engine.opportunities[pair_key(PAIRS[0])]['prices']['polymarket_no_ask'] == 0.45
+
+
+def test_repeated_and_unrelated_updates_do_not_re_evaluate(tmp_path):
+    engine = PriceEngine(PAIRS, stake=100)
+    engine.run(ReplayFeed(write_feed(tmp_path / 'feed.jsonl', book('KXA', 0.40, 0.62, 'a-yes', 0.60, 'a-no', 0.45))))
+
+    assert engine.apply_update({'venue': 'polymarket', 'token_id': 'a-no', 'ask': 0.45}) == []
+    assert engine.apply_update({'venue': 'kalshi', 'ticker': 'KXB', 'yes_ask': 0.5, 'no_ask': 0.5}) == [pair_key(PAIRS[1])]
+    assert engine.updates_applied == 4
+
+
+def test_opportunity_is_dropped_when_the_book_moves(tmp_path):
+    engine = PriceEngine(PAIRS, stake=100)
+    engine.run(ReplayFeed(write_feed(tmp_path / 'feed.jsonl', book('KXA', 0.40, 0.62, 'a-yes', 0.60, 'a-no', 0.45))))
+    assert pair_key(PAIRS[0]) in engine.opportunities
+
+    engine.apply_update({'venue': 'polymarket', 'token_id': 'a-no', 'ask': 0.65})
+    assert engine.opportunities == {}
@@ -0,0 +1,129 @@
+import pytest
+
+from verificationCache import VerificationCache
+
+
+class APIError(Exception):
+    """Shaped like postgrest's APIError: the database refused the request"""
+
+    def __init__(self, message, code='23505'):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeSupabase:
+    """Stand-in for the Supabase client's table() API over an in-memory markets table"""
+
+    def __init__(self, rows=(), reject=()):
+        self.rows = list(rows)
+        self.reject = set(reject)
+        self.down = False
+        self.inserts = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+class FakeQuery:
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.bounds = None
+        self.insert_rows = None
+
+    def select(self, *columns):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def insert(self, rows):
+        self.insert_rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def execute(self):
+        supabase = self.supabase
+        if supabase.down:
+            raise ConnectionError("Supabase unreachable")
+        if self.insert_rows is None:
+            start, end = self.bounds or (0, len(supabase.rows))
+            return type('Response', (), {'data': supabase.rows[start:end + 1]})
+        if any(row['kalshi_ticker'] in supabase.reject for row in self.insert_rows):
+            raise APIError("duplicate key value violates unique constraint")
+        supabase.inserts.append([row['kalshi_ticker'] for row in self.insert_rows])
+        supabase.rows.extend(dict(row) for row in self.insert_rows)
+        return type('Response', (), {'data': self.insert_rows})
+
+
+def remote_row(kalshi_ticker, polymarket_id, is_match):
+    return {'kalshi_ticker': kalshi_ticker, 'polymarket_id': polymarket_id, 'kalshi_title': 'title',
+            'poly_question': 'question', 'is_match': is_match}
+
+
+def local_state(cache):
+    return dict(((kalshi, poly), pending) for kalshi, poly, pending in
+                cache._db.execute("SELECT kalshi_ticker, polymarket_id, pending FROM verifications"))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'verification_cache.sqlite')
+
+
+def test_rejected_row_is_set_aside_and_the_rest_flushes(db_path):
+    supabase = FakeSupabase(reject={'BAD'})
+    cache = VerificationCache(supabase, db_path, flush_interval=60).load()
+    cache.put('K1', '1', 'title', 'question', True)
+    cache.put('BAD', '2', 'title', 'question', False)
+    cache.put('K3', '3', 'title', 'question', False)
+
+    assert cache.flush() == 2
+    assert sorted(row['kalshi_ticker'] for row in supabase.rows) == ['K1', 'K3']
+    assert local_state(cache) == {('K1', '1'): 0, ('BAD', '2'): 2, ('K3', '3'): 0}
+    # The refused row stays answerable locally but is never sent again
+    assert cache.get('BAD', '2') is False
+    assert cache._pending == []
+    cache.put('K4', '4', 'title', 'question', True)
+    assert cache.flush() == 1
+    assert supabase.inserts[-1] == ['K4']
+    cache.close()
+
+    reloaded = VerificationCache(supabase, db_path, flush_interval=60).load()
+    assert reloaded._pending == []
+    reloaded.close()
+
+
+def test_flushed_verdicts_are_not_replayed_after_a_crash(db_path):
+    supabase = FakeSupabase([remote_row('K0', '0', True)])
+    cache = VerificationCache(supabase, db_path, flush_interval=60).load()
+    cache.put('K1', '1', 'title', 'question', True)
+    # Dies after the insert reaches Supabase but before the local flags are cleared
+    cache._mark = lambda rows, pending: None
+    assert cache.flush() == 1
+    cache._stop_event.set()
+    cache.put('K2', '2', 'title', 'question', False)
+
+    restarted = VerificationCache(supabase, db_path, flush_interval=60).load()
+    assert [row['kalshi_ticker'] for row in restarted._pending] == ['K2']
+    restarted.close()
+    assert sorted(row['kalshi_ticker'] for row in supabase.rows) == ['K0', 'K1', 'K2']
+
+
+def test_transport_failure_keeps_rows_queued_and_falls_back_offline(db_path):
+    supabase = FakeSupabase([remote_row('K0', '0', True)])
+    VerificationCache(supabase, db_path, flush_interval=60).load().close()
+
+    supabase.down = True
+    cache = VerificationCache(supabase, db_path, flush_interval=60).load()
+    assert cache.get('K0', '0') is True
+    cache.put('K1', '1', 'title', 'question', False)
+    assert cache.flush() == 0
+    assert [row['kalshi_ticker'] for row in cache._pending] == ['K1']
+    assert local_state(cache)[('K1', '1')] == 1
+
+    supabase.down = False
+    assert cache.flush() == 1
+    assert cache._pending == []
+    assert local_state(cache)[('K1', '1')] == 0
+    cache.close()
+    assert supabase.inserts == [['K1']]
@@ -0,0 +1,97 @@
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+KALSHI_API_HOST = "https://api.elections.kalshi.com"
+KALSHI_LOGIN_HOST = "https://trading-api.kalshi.com"
+GAMMA_API_HOST = "https://gamma-api.polymarket.com"
+
+
+class VenueClient:
+    """
+    Shared HTTP layer for every venue call.
+
+    One requests.Session keeps TCP+TLS connections alive per host, a semaphore per host caps
+    concurrent requests, and warm() opens connections to latency-critical hosts ahead of time.
+    Order traffic uses its own instance (get_order_client()), so it never queues behind
+    catalog paging or price polling.
+    """
+
+    def __init__(self, pool_size=32, max_per_host=8, timeout=10, lane='data'):
+        self.lane = lane
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).netloc
+        metrics.inc('venue_requests_total', host=host, method=method, lane=self.lane)
+        with self._host_limit(url), metrics.timer('venue_request_seconds', host=host, method=method, lane=self.lane):
+            response = self.session.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            metrics.inc('venue_http_errors_total', host=host, status=response.status_code, lane=self.lane)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def warm(self, urls, connections=2, **kwargs):
+        """Open keep-alive connections to each url's host in the background"""
+        def open_connection(url):
+            try:
+                self.request("HEAD", url, **kwargs)
+            except requests.RequestException as e:
+                logging.debug(f"Warm-up of {url} failed: {e}")
+
+        threads = [
+            threading.Thread(target=open_connection, args=(url,), daemon=True)
+            for url in urls for _ in range(connections)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+
+_venue_client = None
+_order_client = None
+_venue_client_lock = threading.Lock()
+
+
+def get_venue_client():
+    """Process-wide VenueClient for catalog, price and other read traffic, created on first use"""
+    global _venue_client
+    with _venue_client_lock:
+        if _venue_client is None:
+            _venue_client = VenueClient()
+        return _venue_client
+
+
+def get_order_client():
+    """Process-wide VenueClient reserved for order placement and order lookups"""
+    global _order_client
+    with _venue_client_lock:
+        if _order_client is None:
+            _order_client = VenueClient(pool_size=8, max_per_host=4, lane='orders')
+        return _order_client
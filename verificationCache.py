@@ -0,0 +1,210 @@
+import logging
+import sqlite3
+import threading
+
+import pandas as pd
+
+from db import NOT_FOUND, fetch_market_verifications, insert_market_verifications
+
+VERIFICATION_CACHE_FILE = 'verification_cache.sqlite'
+
+
+class VerificationCache:
+    """
+    In-memory copy of the Supabase markets table keyed by (kalshi_ticker, polymarket_id).
+
+    load() pulls the whole table once and mirrors it into SQLite, falling back to that copy
+    when Supabase is unreachable. put() answers from memory immediately and queues the row;
+    a background thread inserts queued rows in batches. Rows not yet flushed are flagged in
+    SQLite, so they are retried on the next start if the process dies first (unless Supabase
+    already has them). A row the database rejects is set aside instead of blocking the queue.
+    """
+
+    def __init__(self, client=None, db_path=VERIFICATION_CACHE_FILE, flush_interval=2.0, batch_size=100):
+        """
+        Args:
+            client: Supabase client (or a stand-in with the same table() API); db.supabase if None
+            db_path (str): SQLite file for the local copy
+            flush_interval (float): Seconds between write-behind flushes
+            batch_size (int): Rows per batched insert
+        """
+        self.client = client
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.verifications = {}
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS verifications (
+                kalshi_ticker TEXT NOT NULL,
+                polymarket_id TEXT NOT NULL,
+                kalshi_title TEXT,
+                poly_question TEXT,
+                is_match INTEGER NOT NULL,
+                pending INTEGER NOT NULL DEFAULT 0,  -- 0 flushed, 1 queued, 2 rejected by Supabase
+                PRIMARY KEY (kalshi_ticker, polymarket_id)
+            )
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def _key(kalshi_ticker, polymarket_id):
+        return str(kalshi_ticker), str(polymarket_id)
+
+    def load(self):
+        """Bulk-load every verification (remote if reachable, else the local copy) and start flushing"""
+        with self._lock:
+            pending = self._db.execute(
+                "SELECT kalshi_ticker, polymarket_id, kalshi_title, poly_question, is_match FROM verifications WHERE pending = 1"
+            ).fetchall()
+            self._pending = [self._row(*values) for values in pending]
+
+            try:
+                rows = fetch_market_verifications(self.client)
+                # A flush that reached Supabase but died before clearing the flag must not be replayed
+                remote = {self._key(row['kalshi_ticker'], row['polymarket_id']): bool(row['is_match']) for row in rows}
+                self._pending = [row for row in self._pending
+                                 if remote.get((row['kalshi_ticker'], row['polymarket_id'])) != row['is_match']]
+                self._db.execute("DELETE FROM verifications WHERE pending = 0")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO verifications VALUES (?, ?, ?, ?, ?, 0)",
+                    [(str(row['kalshi_ticker']), str(row['polymarket_id']), row.get('kalshi_title'),
+                      row.get('poly_question'), int(bool(row['is_match']))) for row in rows],
+                )
+                self._db.commit()
+                source = "Supabase"
+            except Exception as e:
+                logging.warning(f"Supabase unreachable, using local verification cache: {e}")
+                source = "local cache"
+
+            # Unflushed local decisions win over whatever the remote copy said
+            self._db.executemany(
+                "INSERT OR REPLACE INTO verifications VALUES (?, ?, ?, ?, ?, 1)",
+                [(row['kalshi_ticker'], row['polymarket_id'], row['kalshi_title'], row['poly_question'], int(row['is_match']))
+                 for row in self._pending],
+            )
+            self._db.commit()
+            self.verifications = {
+                (kalshi_ticker, polymarket_id): bool(is_match)
+                for kalshi_ticker, polymarket_id, is_match in self._db.execute(
+                    "SELECT kalshi_ticker, polymarket_id, is_match FROM verifications")
+            }
+        logging.info(f"Loaded {len(self.verifications)} market verifications from {source}, "
+                     f"{len(self._pending)} waiting to be written")
+        return self.start()
+
+    @staticmethod
+    def _row(kalshi_ticker, polymarket_id, kalshi_title, poly_question, is_match):
+        return {'kalshi_ticker': kalshi_ticker, 'polymarket_id': polymarket_id, 'is_match': bool(is_match),
+                'poly_question': poly_question, 'kalshi_title': kalshi_title}
+
+    def get(self, kalshi_ticker, polymarket_id):
+        """Same contract as db.get_market_verification: True, False or NOT_FOUND"""
+        return self.verifications.get(self._key(kalshi_ticker, polymarket_id), NOT_FOUND)
+
+    def put(self, kalshi_ticker, polymarket_id, kalshi_title, poly_question, is_match):
+        """Record a decision now; it reaches Supabase on the next flush"""
+        kalshi_ticker, polymarket_id = self._key(kalshi_ticker, polymarket_id)
+        with self._lock:
+            self.verifications[(kalshi_ticker, polymarket_id)] = bool(is_match)
+            self._pending.append(self._row(kalshi_ticker, polymarket_id, kalshi_title, poly_question, is_match))
+            self._db.execute("INSERT OR REPLACE INTO verifications VALUES (?, ?, ?, ?, ?, 1)",
+                             (kalshi_ticker, polymarket_id, kalshi_title, poly_question, int(bool(is_match))))
+            self._db.commit()
+
+    def matched_ids(self):
+        """(kalshi tickers, polymarket ids) that already belong to a confirmed match"""
+        pairs = [key for key, is_match in self.verifications.items() if is_match]
+        return {kalshi for kalshi, _ in pairs}, {poly for _, poly in pairs}
+
+    def labeled_pairs(self):
+        """Every decision with the texts the operator saw, as a DataFrame (is_match as bool)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT kalshi_ticker, polymarket_id, kalshi_title, poly_question, is_match FROM verifications"
+            ).fetchall()
+        labels = pd.DataFrame(rows, columns=['kalshi_ticker', 'polymarket_id', 'kalshi_title', 'poly_question', 'is_match'])
+        labels['is_match'] = labels['is_match'].astype(bool)
+        return labels
+
+    @staticmethod
+    def _rejected(error):
+        # PostgREST errors carry a Postgres error code; transport failures don't
+        return getattr(error, 'code', None) is not None
+
+    def _mark(self, rows, pending):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE verifications SET pending = ? WHERE kalshi_ticker = ? AND polymarket_id = ?",
+                [(pending, row['kalshi_ticker'], row['polymarket_id']) for row in rows],
+            )
+            self._db.commit()
+
+    def _insert_rows(self, chunk):
+        """Insert a batch the database refused row by row; returns (written, rows to retry later)"""
+        written, retry = [], []
+        for row in chunk:
+            try:
+                insert_market_verifications([row], self.client)
+                written.append(row)
+            except Exception as e:
+                if not self._rejected(e):
+                    retry.append(row)
+                    continue
+                logging.error(f"Supabase rejected verification {row['kalshi_ticker']}/{row['polymarket_id']}, "
+                              f"keeping it locally only: {e}")
+                self._mark([row], 2)
+        return written, retry
+
+    def flush(self):
+        """Write queued rows to Supabase in batches; rows that fail to reach it stay queued"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            written = 0
+            retry = []
+            for start in range(0, len(batch), self.batch_size):
+                chunk = batch[start:start + self.batch_size]
+                try:
+                    insert_market_verifications(chunk, self.client)
+                    done = chunk
+                except Exception as e:
+                    if not self._rejected(e):
+                        logging.error(f"Flushing market verifications failed, will retry: {e}")
+                        retry.extend(batch[start:])
+                        break
+                    # One bad row fails the whole insert; isolate it so the rest still lands
+                    done, failed = self._insert_rows(chunk)
+                    retry.extend(failed)
+                self._mark(done, 0)
+                written += len(done)
+            if retry:
+                with self._lock:
+                    self._pending = retry + self._pending
+            return written
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            if self._pending:
+                self.flush()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._flush_loop, name='verification-flush', daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the flusher, write anything still queued and close the local copy"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self._db.close()